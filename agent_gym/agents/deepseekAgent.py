@@ -1,10 +1,31 @@
 """DeepSeek Agent implementation using OpenAI-compatible API with Mirau format."""
 
 import json
-import re
+import requests
 from typing import Dict, List, Any, Optional
 from ..core.base import OpenAICompatibleAgent
+from ..core.llm_cache import LLMCache
 from ..core.types import ObservationType, ActionType, ToolsType
+from ..core.tool_calls import parse_tool_calls
+
+
+_SYSTEM_PROMPT_TEMPLATE = """你是一个智能AI助手，可以使用提供的工具来完成各种任务。
+
+## 可使用的工具
+{tools_json}
+
+## 工具调用格式
+当你需要使用工具时，请使用以下XML格式：
+<tool_call>
+{{"name": "工具名称", "arguments": {{"参数名": "参数值"}}}}
+</tool_call>
+
+## 工具响应格式
+工具执行结果会以以下格式返回：
+<tool_response name="工具名称">工具执行结果</tool_response>
+
+请根据用户的请求选择合适的工具并正确调用。
+"""
 
 
 class DeepSeekAgent(OpenAICompatibleAgent):
@@ -12,16 +33,22 @@ class DeepSeekAgent(OpenAICompatibleAgent):
     
     def __init__(self, base_url: str = "https://api.deepseek.com", 
                  api_key: str = "sk-your-deepseek-api-key",
-                 system_prompt: str = ""):
+                 system_prompt: str = "",
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[LLMCache] = None):
         super().__init__(
             base_url=base_url,
             api_key=api_key,
             model_name="deepseek-chat",
-            temperature=0.7
+            temperature=0.7,
+            session=session,
+            cache=cache
         )
         self.custom_system_prompt = system_prompt
         self.tools_info = None
         self._last_tool_calls = []  # Track last tool calls for response formatting
+        self._tools_json_cache = (None, None)  # (tools_info, serialized tools JSON)
+        self._cached_prompt = None  # Rendered system prompt, reused across resets
     
     def act(self, observation: ObservationType, tools: Optional[ToolsType] = None) -> ActionType:
         """Generate an action based on observation and tools."""
@@ -60,7 +87,9 @@ class DeepSeekAgent(OpenAICompatibleAgent):
                     "content": observation
                 })
         
-        return self._conversation_history.copy()
+        # Return the live history rather than a copy: callers only serialize it
+        # into the request payload and never mutate it.
+        return self._conversation_history
     
     def _format_tool_responses(self, env_response: str) -> str:
         """Format Environment's tool execution response to DeepSeek agent format."""
@@ -74,16 +103,16 @@ class DeepSeekAgent(OpenAICompatibleAgent):
             return f'<tool_response name="{tool_name}">{env_response}</tool_response>'
         else:
             # 多个工具调用，尝试按行分割，如果不够就重复使用最后一行
-            lines = env_response.strip().split('\n')
-            formatted_responses = []
+            # 只切分需要的行数：前 len(tool_calls) 个元素与完整切分一致
+            lines = env_response.strip().split('\n', len(self._last_tool_calls))
+            n = len(lines)
             
-            for i, tool_call in enumerate(self._last_tool_calls):
-                tool_name = tool_call["function"]["name"]
-                # 如果有对应的行就使用，否则使用整个响应
-                response_content = lines[i] if i < len(lines) else env_response
-                formatted_responses.append(f'<tool_response name="{tool_name}">{response_content}</tool_response>')
-            
-            return '\n'.join(formatted_responses)
+            # 如果有对应的行就使用，否则使用整个响应
+            return '\n'.join(
+                f'<tool_response name="{tool_call["function"]["name"]}">'
+                f'{lines[i] if i < n else env_response}</tool_response>'
+                for i, tool_call in enumerate(self._last_tool_calls)
+            )
     
     def _build_system_prompt(self) -> str:
         """Build system prompt for DeepSeek agent."""
@@ -91,30 +120,19 @@ class DeepSeekAgent(OpenAICompatibleAgent):
         if self.custom_system_prompt:
             return self.custom_system_prompt
         
-        # Default system prompt with tools info
-        tools_json = json.dumps(
-            self.tools_info if self.tools_info else [], 
-            ensure_ascii=False, 
-            separators=(',', ':')
-        )
-        
-        return f"""你是一个智能AI助手，可以使用提供的工具来完成各种任务。
-
-## 可使用的工具
-{tools_json}
-
-## 工具调用格式
-当你需要使用工具时，请使用以下XML格式：
-<tool_call>
-{{"name": "工具名称", "arguments": {{"参数名": "参数值"}}}}
-</tool_call>
-
-## 工具响应格式
-工具执行结果会以以下格式返回：
-<tool_response name="工具名称">工具执行结果</tool_response>
-
-请根据用户的请求选择合适的工具并正确调用。
-"""
+        # Reuse the serialized tools and rendered prompt while the tools list is
+        # unchanged. Holding a reference to tools_info keeps the identity check reliable.
+        cached_tools, tools_json = self._tools_json_cache
+        if tools_json is None or cached_tools is not self.tools_info:
+            tools_json = json.dumps(
+                self.tools_info if self.tools_info else [], 
+                ensure_ascii=False, 
+                separators=(',', ':')
+            )
+            self._tools_json_cache = (self.tools_info, tools_json)
+            self._cached_prompt = _SYSTEM_PROMPT_TEMPLATE.format(tools_json=tools_json)
+        
+        return self._cached_prompt
     
     def _convert_tools_to_openai_format(self, tools: ToolsType) -> List[Dict[str, Any]]:
         """Convert tools to OpenAI tools format."""
@@ -142,50 +160,7 @@ class DeepSeekAgent(OpenAICompatibleAgent):
     
     def _parse_tool_calls(self, content: str) -> List[Dict[str, Any]]:
         """Parse tool calls from DeepSeek agent response (same format as Mirau)."""
-        tool_calls = []
-        
-        # 使用更精确的解析方法
-        import re
-        
-        # 找到所有 <tool_call> 标签的位置
-        start_pattern = r'<tool_call>\s*'
-        end_pattern = r'\s*</tool_call>'
-        
-        start_matches = list(re.finditer(start_pattern, content))
-        
-        for i, start_match in enumerate(start_matches):
-            start_pos = start_match.end()
-            
-            # 找到对应的结束标签
-            end_match = re.search(end_pattern, content[start_pos:])
-            if not end_match:
-                continue
-            
-            end_pos = start_pos + end_match.start()
-            
-            # 提取JSON字符串
-            json_str = content[start_pos:end_pos].strip()
-            
-            try:
-                tool_data = json.loads(json_str)
-                tool_calls.append({
-                    "id": f"call_{i}",
-                    "type": "function",
-                    "function": {
-                        "name": tool_data["name"],
-                        "arguments": json.dumps(
-                            tool_data["arguments"], 
-                            ensure_ascii=False, 
-                            separators=(',', ':')
-                        )
-                    }
-                })
-            except json.JSONDecodeError as e:
-                print(f"DEBUG: Failed to parse JSON: {json_str}")
-                print(f"DEBUG: Error: {e}")
-                continue
-        
-        return tool_calls
+        return parse_tool_calls(content)
     
     def reset(self) -> None:
         """Reset conversation history and tool call tracking."""
@@ -1,21 +1,27 @@
 """Mirau Agent implementation for Agent Gym."""
 
 import json
-import re
+import requests
 from typing import Dict, List, Any, Optional
 from ..core.base import OpenAICompatibleAgent
+from ..core.llm_cache import LLMCache
 from ..core.types import ObservationType, ActionType, ToolsType
+from ..core.tool_calls import parse_tool_calls
 
 
 class MirauAgent(OpenAICompatibleAgent):
     """Mirau Agent that uses OpenAI-compatible API with custom format."""
     
-    def __init__(self, base_url: str = "http://localhost:7996", api_key: str = "dummy",model_name="mirau-agent"):
+    def __init__(self, base_url: str = "http://localhost:7996", api_key: str = "dummy",model_name="mirau-agent",
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[LLMCache] = None):
         super().__init__(
             base_url=base_url, 
             api_key=api_key,
             model_name=model_name,
-            temperature=0.7
+            temperature=0.7,
+            session=session,
+            cache=cache
         )
         self.tools_info = None
         self._last_tool_calls = []  # Track last tool calls for response formatting
@@ -131,50 +137,7 @@ class MirauAgent(OpenAICompatibleAgent):
     
     def _parse_tool_calls(self, content: str) -> List[Dict[str, Any]]:
         """Parse tool calls from mirau agent response."""
-        tool_calls = []
-        
-        # 使用更精确的解析方法
-        import re
-        
-        # 找到所有 <tool_call> 标签的位置
-        start_pattern = r'<tool_call>\s*'
-        end_pattern = r'\s*</tool_call>'
-        
-        start_matches = list(re.finditer(start_pattern, content))
-        
-        for i, start_match in enumerate(start_matches):
-            start_pos = start_match.end()
-            
-            # 找到对应的结束标签
-            end_match = re.search(end_pattern, content[start_pos:])
-            if not end_match:
-                continue
-            
-            end_pos = start_pos + end_match.start()
-            
-            # 提取JSON字符串
-            json_str = content[start_pos:end_pos].strip()
-            
-            try:
-                tool_data = json.loads(json_str)
-                tool_calls.append({
-                    "id": f"call_{i}",
-                    "type": "function",
-                    "function": {
-                        "name": tool_data["name"],
-                        "arguments": json.dumps(
-                            tool_data["arguments"], 
-                            ensure_ascii=False, 
-                            separators=(',', ':')
-                        )
-                    }
-                })
-            except json.JSONDecodeError as e:
-                print(f"DEBUG: Failed to parse JSON: {json_str}")
-                print(f"DEBUG: Error: {e}")
-                continue
-        
-        return tool_calls
+        return parse_tool_calls(content)
     
     def reset(self) -> None:
         """Reset conversation history and tool call tracking."""
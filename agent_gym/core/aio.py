@@ -0,0 +1,21 @@
+"""Event loop helpers for Agent Gym.
+
+Uses uvloop when it is installed and falls back to the standard asyncio loop
+otherwise.
+"""
+
+import asyncio
+from typing import Any, Coroutine
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion on a new event loop, like ``asyncio.run``."""
+    # uvloop.run needs uvloop >= 0.18; older releases only offer the loop policy
+    if uvloop is not None and hasattr(uvloop, "run"):
+        return uvloop.run(coro)
+    return asyncio.run(coro)
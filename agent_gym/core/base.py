@@ -1,38 +1,110 @@
 import json
-import asyncio
+import os
 import requests
-import aiohttp
+from requests.adapters import HTTPAdapter
+import ctypes
 import signal
+import threading
 from contextlib import contextmanager
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Union, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
 
 from .types import ObservationType, ActionType, ToolsType, Reward, Done
 from .exceptions import APIError
+from .json_utils import json_loads, json_dumps
+from .llm_cache import LLMCache
+from .aio import run_async
+
+if TYPE_CHECKING:
+    import aiohttp  # Imported lazily at runtime; only the annotations need it
 
 class TimeoutError(EnvironmentError):
     """Timeout error for tool execution."""
     pass
 
 
+def _raise_in_thread(thread_id: int, exc_type: Optional[type]) -> None:
+    """Asynchronously raise ``exc_type`` in the thread identified by ``thread_id``.
+    
+    Passing None clears an exception that has been scheduled but not yet delivered.
+    """
+    exc = ctypes.py_object(exc_type) if exc_type is not None else None
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), exc)
+
+
+@contextmanager
+def timeout_context(seconds: float):
+    """Context manager for handling timeouts.
+    
+    On the main thread this uses SIGALRM, which also interrupts blocking calls
+    such as time.sleep or socket reads. Signals cannot be used elsewhere, so
+    other threads fall back to a timer thread (see _thread_timeout), which is
+    weaker; pass a timeout to blocking calls made there as well.
+    """
+    if threading.current_thread() is threading.main_thread():
+        with _signal_timeout(seconds):
+            yield
+    else:
+        with _thread_timeout(seconds):
+            yield
+
+
 @contextmanager
-def timeout_context(seconds: int):
-    """Context manager for handling timeouts."""
+def _signal_timeout(seconds: float):
+    """SIGALRM-based timeout; main thread only."""
     def timeout_handler(signum, frame):
         raise TimeoutError(f"Operation timed out after {seconds} seconds")
     
     # Set up the signal handler
     old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-    signal.alarm(seconds)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
     
     try:
         yield
     finally:
         # Restore the old handler
-        signal.alarm(0)
+        signal.setitimer(signal.ITIMER_REAL, 0)
         signal.signal(signal.SIGALRM, old_handler)
 
+
+@contextmanager
+def _thread_timeout(seconds: float):
+    """Timer-thread timeout for threads that cannot receive signals.
+    
+    The exception is delivered between bytecodes, so a blocking C call is only
+    interrupted once it returns, and a body that swallows exceptions can
+    swallow the timeout too.
+    """
+    thread_id = threading.get_ident()
+    lock = threading.Lock()
+    state = {"finished": False, "fired": False, "delivered": False}
+    
+    def on_timeout():
+        with lock:
+            if not state["finished"]:
+                state["fired"] = True
+                _raise_in_thread(thread_id, TimeoutError)
+    
+    timer = threading.Timer(seconds, on_timeout)
+    timer.daemon = True
+    timer.start()
+    
+    try:
+        yield
+    except TimeoutError as e:
+        if state["fired"] and not e.args:
+            state["delivered"] = True
+            raise TimeoutError(f"Operation timed out after {seconds} seconds") from None
+        raise
+    finally:
+        with lock:
+            state["finished"] = True
+            if state["fired"] and not state["delivered"]:
+                # The timer fired after the body returned; drop the pending
+                # exception so completed work is not reported as a timeout
+                _raise_in_thread(thread_id, None)
+        timer.cancel()
+
 class Environment(ABC):
     """Abstract base class for all environments."""
     
@@ -59,6 +131,29 @@ class Environment(ABC):
         pass
 
 
+# Parsed task files keyed by absolute path, invalidated on mtime/size change.
+# Environments created for the same file share one list of task dicts.
+_TASK_CACHE: Dict[str, Tuple[int, int, List[Dict[str, Any]]]] = {}
+_TASK_CACHE_LOCK = threading.Lock()
+
+
+def load_tasks(data_file: str) -> List[Dict[str, Any]]:
+    """Load and cache the task list stored in ``data_file``.
+    
+    The returned list is shared by every caller; treat it as read-only.
+    """
+    path = os.path.abspath(data_file)
+    st = os.stat(path)
+    with _TASK_CACHE_LOCK:
+        cached = _TASK_CACHE.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        with open(path, 'rb') as f:
+            tasks = json_loads(f.read())
+        _TASK_CACHE[path] = (st.st_mtime_ns, st.st_size, tasks)
+        return tasks
+
+
 class StaticEnvironment(Environment):
     """Base class for environments with predefined tasks."""
     
@@ -67,15 +162,25 @@ class StaticEnvironment(Environment):
         self.task_id = task_id
         self.current_task = None
     
+    @classmethod
+    def spawn_batch(cls, data_file: str, task_ids: List[int], **kwargs) -> List['StaticEnvironment']:
+        """Create one environment per task id from a single parse of ``data_file``.
+        
+        Args:
+            data_file: Path to JSON file containing tasks
+            task_ids: Task indices to create environments for
+            **kwargs: Extra constructor arguments shared by every environment
+        """
+        load_tasks(data_file)
+        return [cls(data_file=data_file, task_id=task_id, **kwargs) for task_id in task_ids]
+    
     def _load_task_data(self):
         """Load task data from file."""
         if not self.data_file:
             return
             
         try:
-            import json
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                tasks = json.load(f)
+            tasks = load_tasks(self.data_file)
             if 0 <= self.task_id < len(tasks):
                 self.current_task = tasks[self.task_id]
         except Exception as e:
@@ -152,51 +257,118 @@ class OpenAICompatibleAgent(Agent):
     """Abstract base class for agents that use OpenAI-compatible API."""
     
     def __init__(self, base_url: str = "http://localhost:8000", api_key: str = "dummy", 
-                 model_name: str = "gpt-3.5-turbo", temperature: float = 0.7):
+                 model_name: str = "gpt-3.5-turbo", temperature: float = 0.7,
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[LLMCache] = None):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.model_name = model_name
         self.temperature = temperature
         self._conversation_history = []
         self._session = None
+        
+        # Persistent HTTP session so sync calls reuse keep-alive connections;
+        # a runner may pass one shared with its environments, so the auth
+        # headers are sent per request rather than set on the session
+        self._headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=5, pool_maxsize=10)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self._sync_session = session
+        self.cache = cache  # Optional LLMCache for sync calls
+        
+        # Serialized form of each message sent so far, keyed by position and
+        # checked by identity, so history prefixes are not re-encoded each turn
+        self._msg_json_cache = []  # (message, serialized bytes) pairs
+    
+    def _serialize_messages(self, messages: List[Dict[str, Any]]) -> bytes:
+        """Serialize messages to a JSON array, reusing cached per-message bytes.
+        
+        Messages are assumed not to be mutated after they are appended to the
+        conversation history.
+        """
+        cache = self._msg_json_cache
+        encoded = []
+        for i, message in enumerate(messages):
+            if i < len(cache) and cache[i][0] is message:
+                encoded.append(cache[i][1])
+                continue
+            data = json_dumps(message).encode('utf-8')
+            del cache[i:]
+            cache.append((message, data))
+            encoded.append(data)
+        return b'[' + b','.join(encoded) + b']'
     
     def _make_api_call(self, messages: List[Dict[str, Any]], 
                       stream: bool = False, **kwargs) -> Dict[str, Any]:
         """Make synchronous API call to OpenAI-compatible endpoint."""
         payload = {
             "model": self.model_name,
-            "messages": messages,
             "temperature": self.temperature,
             "stream": stream,
             **kwargs
         }
+        # Splice the pre-serialized messages array into the request body
+        body = json_dumps(payload).encode('utf-8')[:-1] + b',"messages":' + self._serialize_messages(messages) + b'}'
+        url = f"{self.base_url}/v1/chat/completions"
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        if self.cache is not None:
+            cache_key = self.cache.make_key(url, body)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
-            response = requests.post(
-                f"{self.base_url}/v1/chat/completions",
-                json=payload,
-                headers=headers,
+            response = self._sync_session.post(
+                url,
+                data=body,
+                headers=self._headers,
                 stream=stream,
                 timeout=60
             )
             response.raise_for_status()
             
             if stream:
-                return self._handle_stream_response(response)
+                result = self._handle_stream_response(response)
             else:
-                return response.json()
+                result = response.json()
                 
         except requests.exceptions.RequestException as e:
             raise APIError(f"API request failed: {e}")
+        
+        if self.cache is not None:
+            self.cache.set(cache_key, result)
+        return result
+    
+    def _get_session(self, limit_per_host: int = 32) -> 'aiohttp.ClientSession':
+        """Return the shared aiohttp session, creating it on first use.
+        
+        Must be called from inside a running event loop. Creation has no await
+        point, so concurrent coroutines on the same loop cannot race here.
+        """
+        import aiohttp  # Imported lazily: only the async path needs it
+        
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=limit_per_host,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60
+                ),
+                json_serialize=json_dumps
+            )
+        return self._session
     
     async def _make_api_call_async(self, messages: List[Dict[str, Any]], 
                                   stream: bool = False, **kwargs) -> Dict[str, Any]:
         """Make asynchronous API call to OpenAI-compatible endpoint."""
+        import aiohttp
+        
         payload = {
             "model": self.model_name,
             "messages": messages,
@@ -211,10 +383,9 @@ class OpenAICompatibleAgent(Agent):
         }
         
         try:
-            if not self._session:
-                self._session = aiohttp.ClientSession()
+            session = self._get_session()
             
-            async with self._session.post(
+            async with session.post(
                 f"{self.base_url}/v1/chat/completions",
                 json=payload,
                 headers=headers,
@@ -232,69 +403,102 @@ class OpenAICompatibleAgent(Agent):
     
     def _make_api_calls_concurrent(self, messages_list: List[List[Dict[str, Any]]], 
                                   max_workers: int = 5, **kwargs) -> List[Dict[str, Any]]:
-        """Make multiple concurrent API calls."""
-        results = []
+        """Make multiple concurrent API calls.
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_messages = {
-                executor.submit(self._make_api_call, messages, **kwargs): messages 
-                for messages in messages_list
-            }
-            
-            for future in as_completed(future_to_messages):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    raise APIError(f"Concurrent API call failed: {e}")
+        Calls are issued as coroutines over a shared aiohttp session capped at
+        ``max_workers`` connections; results are returned in input order.
+        """
+        import asyncio
+        
+        async def _gather() -> List[Any]:
+            self._get_session(limit_per_host=max_workers)
+            try:
+                return await asyncio.gather(
+                    *[self._make_api_call_async(messages, **kwargs) for messages in messages_list],
+                    return_exceptions=True
+                )
+            finally:
+                # The session is bound to this event loop, which run_async closes
+                await self.close()
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            results = run_async(_gather())
+        else:
+            raise APIError("Concurrent API calls cannot be made from a running event loop; "
+                           "await _make_api_call_async instead")
+        
+        for result in results:
+            if isinstance(result, Exception):
+                raise APIError(f"Concurrent API call failed: {result}")
         
         return results
     
     def _handle_stream_response(self, response) -> Dict[str, Any]:
         """Handle streaming response from API."""
-        full_content = ""
+        content_chunks = []
         
         for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    data = line[6:]  # Remove 'data: ' prefix
-                    if data.strip() == '[DONE]':
-                        break
-                    try:
-                        chunk = json.loads(data)
-                        if 'choices' in chunk and len(chunk['choices']) > 0:
-                            delta = chunk['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                full_content += delta['content']
-                    except json.JSONDecodeError:
-                        continue
+            # Check the SSE prefix on raw bytes; json_loads accepts bytes directly
+            if line[:6] == b'data: ':
+                data = line[6:]  # Remove 'data: ' prefix
+                if data.strip() == b'[DONE]':
+                    break
+                try:
+                    chunk = json_loads(data)
+                    if 'choices' in chunk and len(chunk['choices']) > 0:
+                        delta = chunk['choices'][0].get('delta', {})
+                        if 'content' in delta:
+                            content_chunks.append(delta['content'])
+                except json.JSONDecodeError:
+                    continue
         
         return {
             "choices": [{
                 "message": {
                     "role": "assistant",
-                    "content": full_content
+                    "content": ''.join(content_chunks)
                 }
             }]
         }
     
+    async def _iter_stream_lines_async(self, response, chunk_size: int = 8192):
+        """Yield raw lines from an async streamed body.
+        
+        Reads fixed-size chunks and splits them on b'\n' in a single buffer,
+        so SSE events fragmented across TCP packets are reassembled without
+        per-line decoding.
+        """
+        buffer = bytearray()
+        async for chunk in response.content.iter_chunked(chunk_size):
+            buffer.extend(chunk)
+            start = 0
+            newline = buffer.find(b'\n')
+            while newline != -1:
+                yield bytes(buffer[start:newline])
+                start = newline + 1
+                newline = buffer.find(b'\n', start)
+            del buffer[:start]
+        if buffer:
+            yield bytes(buffer)
+    
     async def _handle_stream_response_async(self, response) -> Dict[str, Any]:
         """Handle streaming response from async API."""
-        full_content = ""
+        content_chunks = []
         
-        async for line in response.content:
-            line = line.decode('utf-8').strip()
-            if line.startswith('data: '):
+        async for line in self._iter_stream_lines_async(response):
+            line = line.strip()
+            if line[:6] == b'data: ':
                 data = line[6:]  # Remove 'data: ' prefix
-                if data.strip() == '[DONE]':
+                if data == b'[DONE]':
                     break
                 try:
-                    chunk = json.loads(data)
+                    chunk = json_loads(data)
                     if 'choices' in chunk and len(chunk['choices']) > 0:
                         delta = chunk['choices'][0].get('delta', {})
                         if 'content' in delta:
-                            full_content += delta['content']
+                            content_chunks.append(delta['content'])
                 except json.JSONDecodeError:
                     continue
         
@@ -302,7 +506,7 @@ class OpenAICompatibleAgent(Agent):
             "choices": [{
                 "message": {
                     "role": "assistant",
-                    "content": full_content
+                    "content": ''.join(content_chunks)
                 }
             }]
         }
@@ -332,12 +536,10 @@ class OpenAICompatibleAgent(Agent):
             await self._session.close()
             self._session = None
     
-    def __del__(self):
-        """Cleanup on deletion."""
-        if self._session and not self._session.closed:
-            # Try to close session if event loop is running
-            try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(self.close())
-            except RuntimeError:
-                pass
\ No newline at end of file
+    async def __aenter__(self):
+        """Use the agent as an async context manager."""
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        """Close the async session on exit."""
+        await self.close()
@@ -0,0 +1,48 @@
+"""JSON helpers for Agent Gym.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. orjson's decode error subclasses ``json.JSONDecodeError``, so
+callers can keep catching the stdlib exception.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Deserialize JSON from a str or bytes object."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> str:
+    """Serialize to compact JSON without escaping non-ASCII characters.
+
+    Equivalent to ``json.dumps(obj, ensure_ascii=False, separators=(',', ':'))``.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            # e.g. integers wider than 64 bits; let the stdlib handle them
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def json_dumps_indent(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON indented by two spaces, for files meant to be read.
+
+    Equivalent to ``json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')``.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
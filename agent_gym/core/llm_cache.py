@@ -0,0 +1,86 @@
+"""Response cache for LLM calls in Agent Gym.
+
+Responses are keyed by a SHA-256 digest of the endpoint and the exact request
+body, so any change to the model, sampling settings, tools or messages is a
+different entry. With temperature > 0 a hit replays the recorded sample
+instead of drawing a new one; only enable the cache when that is wanted
+(re-runs, debugging, fixed fixtures).
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from .json_utils import json_loads, json_dumps
+
+
+class LLMCache:
+    """Cache of parsed LLM responses with a memory or disk backend."""
+
+    BACKENDS = ("memory", "disk")
+
+    def __init__(self, backend: str = "disk", cache_dir: str = ".cache/llm"):
+        """Initialize the cache.
+
+        Args:
+            backend: "memory" (per process) or "disk" (one JSON file per entry)
+            cache_dir: Directory for the disk backend
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown cache backend '{backend}' (expected one of {self.BACKENDS})")
+        self.backend = backend
+        self.cache_dir = os.path.abspath(cache_dir)
+        self._entries: Dict[str, bytes] = {}  # Serialized, so hits are fresh copies
+        self._lock = threading.Lock()
+        if backend == "disk":
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(url: str, body: bytes) -> str:
+        """Return the cache key for a request body sent to ``url``."""
+        digest = hashlib.sha256(url.encode('utf-8'))
+        digest.update(b'\n')
+        digest.update(body)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached response for ``key``, or None on a miss."""
+        if self.backend == "memory":
+            with self._lock:
+                data = self._entries.get(key)
+        else:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+        if data is None:
+            return None
+        try:
+            return json_loads(data)
+        except ValueError:
+            return None
+
+    def set(self, key: str, response: Any) -> None:
+        """Store ``response`` under ``key``."""
+        data = json_dumps(response).encode('utf-8')
+        if self.backend == "memory":
+            with self._lock:
+                self._entries[key] = data
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
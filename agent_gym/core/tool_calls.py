@@ -0,0 +1,62 @@
+"""Parsing of Mirau-format ``<tool_call>`` blocks in model output."""
+
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from .json_utils import json_loads, json_dumps
+
+
+logger = logging.getLogger(__name__)
+
+TOOL_CALL_START = '<tool_call>'
+TOOL_CALL_END = '</tool_call>'
+
+
+def iter_tool_call_blocks(content: str) -> Iterator[str]:
+    """Yield the stripped JSON text of each <tool_call> block in order."""
+    # 标签是固定字面量，直接用 str.find 线性扫描，无需正则
+    idx = 0
+    while True:
+        start_pos = content.find(TOOL_CALL_START, idx)
+        if start_pos < 0:
+            return
+        start_pos += len(TOOL_CALL_START)
+        
+        # 找到对应的结束标签
+        end_pos = content.find(TOOL_CALL_END, start_pos)
+        if end_pos < 0:
+            return
+        idx = end_pos + len(TOOL_CALL_END)
+        
+        # 提取JSON字符串
+        yield content[start_pos:end_pos].strip()
+
+
+def build_tool_call(index: int, json_str: str) -> Optional[Dict[str, Any]]:
+    """Build an OpenAI-format tool call from one block, or None if it is malformed."""
+    try:
+        tool_data = json_loads(json_str)
+    except json.JSONDecodeError as e:
+        logger.debug("Failed to parse tool_call JSON: %s (%s)", json_str, e)
+        return None
+    
+    arguments = tool_data["arguments"]
+    # 已是 JSON 字符串（OpenAI 格式）时直接使用，避免重复序列化
+    if not isinstance(arguments, str):
+        arguments = json_dumps(arguments)
+    return {
+        "id": f"call_{index}",
+        "type": "function",
+        "function": {
+            "name": tool_data["name"],
+            "arguments": arguments
+        }
+    }
+
+
+def parse_tool_calls(content: str) -> List[Dict[str, Any]]:
+    """Parse all well-formed tool calls; ids count malformed blocks too."""
+    built = (build_tool_call(i, json_str)
+             for i, json_str in enumerate(iter_tool_call_blocks(content)))
+    return [tool_call for tool_call in built if tool_call is not None]
@@ -1,6 +1,6 @@
 """Type definitions for Agent Gym."""
 
-from typing import Any, TypeVar, List, Dict
+from typing import Any, TypeVar
 
 # Generic types for maximum flexibility
 Observation = TypeVar('Observation')
@@ -4,18 +4,311 @@ import os
 import subprocess
 import tempfile
 import shutil
-import json
-from typing import Dict, List, Any, Tuple
-from pathlib import Path
+import atexit
+import errno
+import logging
+import queue
+import select
+import signal
+import sys
+import threading
+import time
+import uuid
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple, Set
 
 from ..core.base import StaticEnvironment, timeout_context, TimeoutError
 from ..core.types import ObservationType, ActionType, ToolsType, Reward, Done
 from ..core.exceptions import EnvironmentError
+from ..core.json_utils import json_loads
+
+logger = logging.getLogger(__name__)
+
+
+# Path-valued arguments of each file tool, split into (read paths, written paths).
+# Tools missing here (execute_shell) may touch any path and always run alone.
+_PATH_ARGUMENTS = {
+    "read_file": (("file_path",), ()),
+    "list_directory": (("dir_path",), ()),
+    "write_file": ((), ("file_path",)),
+    "create_directory": ((), ("dir_path",)),
+    "delete_file": ((), ("file_path",)),
+    "move_file": ((), ("source_path", "dest_path")),
+    "copy_file": (("source_path",), ("dest_path",)),
+}
+
+
+# The working directory is process-wide; task scripts that need it chdir
+# under this lock so concurrent environments don't see each other's cwd.
+_CWD_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _compile_script(source: str, filename: str):
+    """Compile a task setup/verify script once and reuse the code object."""
+    return compile(source, filename, "exec")
+
+
+def _copy2(source_path: str, dest_path: str) -> None:
+    """Copy a file with metadata like shutil.copy2, using copy_file_range when possible.
+    
+    os.copy_file_range copies inside the kernel (and can reflink on
+    filesystems that support it); unsupported cases fall back to shutil.copy2.
+    """
+    if not hasattr(os, "copy_file_range") or not os.path.isfile(source_path):
+        shutil.copy2(source_path, dest_path)
+        return
+    
+    if os.path.isdir(dest_path):
+        dest_path = os.path.join(dest_path, os.path.basename(source_path))
+    if os.path.exists(dest_path) and os.path.samefile(source_path, dest_path):
+        raise shutil.SameFileError(f"{source_path!r} and {dest_path!r} are the same file")
+    
+    try:
+        with open(source_path, 'rb') as fsrc, open(dest_path, 'wb') as fdst:
+            while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30):
+                pass
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+            raise
+        shutil.copy2(source_path, dest_path)
+        return
+    shutil.copystat(source_path, dest_path)
+
+
+class _WorkspacePool:
+    """Pool of empty workspace directories shared by all environments.
+    
+    acquire() hands out a pre-created directory, so reset() skips mkdtemp;
+    release() deletes the used directory and creates its replacement on
+    background threads, so cleanup() does not block on rmtree.
+    """
+    
+    def __init__(self, size: int = 4, prefix: str = "agent_gym_"):
+        self.size = size
+        self.prefix = prefix
+        self._ready = queue.Queue()
+        self._executor = None
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def acquire(self) -> str:
+        """Return an empty workspace directory."""
+        try:
+            return self._ready.get_nowait()
+        except queue.Empty:
+            return tempfile.mkdtemp(prefix=self.prefix)
+    
+    def release(self, workspace_dir: str) -> None:
+        """Delete a used workspace directory in the background.
+        
+        After close() or during interpreter shutdown (environments collected
+        late) the directory is deleted synchronously instead.
+        """
+        with self._lock:
+            if not self._closed and not sys.is_finalizing():
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent_gym_rm")
+                try:
+                    self._executor.submit(self._recycle, workspace_dir)
+                    return
+                except RuntimeError:
+                    pass  # Interpreter is shutting down; fall through
+        self._remove(workspace_dir)
+    
+    @staticmethod
+    def _remove(workspace_dir: str) -> None:
+        try:
+            shutil.rmtree(workspace_dir)
+        except Exception as e:
+            print(f"Warning: Failed to cleanup workspace: {e}")
+    
+    def _recycle(self, workspace_dir: str) -> None:
+        self._remove(workspace_dir)
+        if not self._closed and self._ready.qsize() < self.size:
+            self._ready.put(tempfile.mkdtemp(prefix=self.prefix))
+    
+    def close(self) -> None:
+        """Wait for pending deletions and remove the pre-created directories."""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        while True:
+            try:
+                shutil.rmtree(self._ready.get_nowait(), ignore_errors=True)
+            except queue.Empty:
+                break
+
+
+_WORKSPACE_POOL = _WorkspacePool()
+atexit.register(_WORKSPACE_POOL.close)
+
+
+# Tool schema in OpenAI function calling format. Built once and shared by all
+# instances; treat it as read-only.
+_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "read_file",
+            "description": "Read the contents of a file",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the file to read"
+                    }
+                },
+                "required": ["file_path"]
+            }
+        }
+    },
+    {
+        "type": "function", 
+        "function": {
+            "name": "write_file",
+            "description": "Write content to a file",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the file to write"
+                    },
+                    "content": {
+                        "type": "string",
+                        "description": "Content to write to the file"
+                    }
+                },
+                "required": ["file_path", "content"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_directory",
+            "description": "List files and directories in a given path",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "dir_path": {
+                        "type": "string",
+                        "description": "Path to the directory to list (default: current directory)",
+                        "default": "."
+                    }
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "execute_shell",
+            "description": "Execute a shell command",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "command": {
+                        "type": "string",
+                        "description": "Shell command to execute"
+                    }
+                },
+                "required": ["command"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_directory", 
+            "description": "Create a new directory",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "dir_path": {
+                        "type": "string",
+                        "description": "Path of the directory to create"
+                    }
+                },
+                "required": ["dir_path"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "delete_file",
+            "description": "Delete a file",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string", 
+                        "description": "Path to the file to delete"
+                    }
+                },
+                "required": ["file_path"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "move_file",
+            "description": "Move or rename a file",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "source_path": {
+                        "type": "string",
+                        "description": "Source file path"
+                    },
+                    "dest_path": {
+                        "type": "string", 
+                        "description": "Destination file path"
+                    }
+                },
+                "required": ["source_path", "dest_path"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "copy_file",
+            "description": "Copy a file to another location",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "source_path": {
+                        "type": "string",
+                        "description": "Source file path"
+                    },
+                    "dest_path": {
+                        "type": "string",
+                        "description": "Destination file path"
+                    }
+                },
+                "required": ["source_path", "dest_path"]
+            }
+        }
+    }
+]
 
 
 class CommandLineEnvironment(StaticEnvironment):
     """Command line environment that provides file system and shell tools."""
     
+    # read_file returns at most this many bytes, followed by a truncation notice
+    MAX_READ_BYTES = 1 << 20
+    # execute_shell keeps at most this many bytes of stdout and of stderr
+    MAX_SHELL_OUTPUT = 1 << 20
+    
     def __init__(self, data_file: str = None, task_id: int = 0):
         """Initialize the command line environment.
         
@@ -26,6 +319,22 @@ class CommandLineEnvironment(StaticEnvironment):
         super().__init__(data_file, task_id)
         self.workspace_dir = None
         self.tools = self._define_tools()
+        self.max_tool_workers = int(os.environ.get("TOOL_CONCURRENCY_LIMIT", 4))
+        self._pool = None  # Created lazily for batches of independent tool calls
+        self._shell = None  # Persistent /bin/sh coprocess for execute_shell
+        self._shell_stderr_path = None
+        self._shell_lock = threading.Lock()
+        self._step_deadline = None  # (monotonic deadline, timeout) of the running step
+        self._dispatch = {
+            "read_file": lambda a: self._read_file(a["file_path"]),
+            "write_file": lambda a: self._write_file(a["file_path"], a["content"]),
+            "list_directory": lambda a: self._list_directory(a.get("dir_path", ".")),
+            "execute_shell": lambda a: self._execute_shell(a["command"]),
+            "create_directory": lambda a: self._create_directory(a["dir_path"]),
+            "delete_file": lambda a: self._delete_file(a["file_path"]),
+            "move_file": lambda a: self._move_file(a["source_path"], a["dest_path"]),
+            "copy_file": lambda a: self._copy_file(a["source_path"], a["dest_path"]),
+        }
         
         if data_file:
             self._load_task_data()
@@ -35,8 +344,8 @@ class CommandLineEnvironment(StaticEnvironment):
         # Clean up previous workspace if exists
         self.cleanup()
         
-        # Create new temporary workspace directory
-        self.workspace_dir = tempfile.mkdtemp(prefix="agent_gym_")
+        # Take an empty workspace directory from the shared pool
+        self.workspace_dir = _WORKSPACE_POOL.acquire()
         
         # Setup environment if specified in task
         if self.current_task and "env" in self.current_task:
@@ -48,12 +357,16 @@ class CommandLineEnvironment(StaticEnvironment):
     
     def cleanup(self):
         """Clean up the workspace directory."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        
+        self._close_shell()
+        
         if self.workspace_dir and os.path.exists(self.workspace_dir):
-            try:
-                shutil.rmtree(self.workspace_dir)
-                self.workspace_dir = None
-            except Exception as e:
-                print(f"Warning: Failed to cleanup workspace: {e}")
+            # Deletion happens on the pool's background thread
+            _WORKSPACE_POOL.release(self.workspace_dir)
+            self.workspace_dir = None
     
     def __del__(self):
         """Cleanup when object is destroyed."""
@@ -61,6 +374,7 @@ class CommandLineEnvironment(StaticEnvironment):
     
     def step(self, action: ActionType, timeout: int = 30) -> Tuple[ObservationType, Reward, Done]:
         """Execute an action with timeout."""
+        self._step_deadline = (time.monotonic() + timeout, timeout)
         try:
             with timeout_context(timeout):
                 if self._is_tool_call(action):
@@ -79,44 +393,105 @@ class CommandLineEnvironment(StaticEnvironment):
             return f"Timeout error: {str(e)}", -0.5, False
         except Exception as e:
             return f"Execution error: {str(e)}", -0.1, False
+        finally:
+            self._step_deadline = None
     
     def _setup_environment(self, env_script: str):
         """Set up the environment using the provided script."""
-        original_cwd = os.getcwd()
-        try:
-            os.chdir(self.workspace_dir)
-            # Execute the environment setup script
-            exec(env_script, {"os": os, "__workspace__": self.workspace_dir})
-        finally:
-            os.chdir(original_cwd)
+        code = _compile_script(env_script, "<env>")
+        with _CWD_LOCK:
+            original_cwd = os.getcwd()
+            try:
+                os.chdir(self.workspace_dir)
+                # Execute the environment setup script
+                exec(code, {"os": os, "__workspace__": self.workspace_dir})
+            finally:
+                os.chdir(original_cwd)
     
     def _is_tool_call(self, action: ActionType) -> bool:
         """Check if the action is a tool call."""
-        if isinstance(action, dict):
-            return "tool_calls" in action and action["tool_calls"]
-        return False
+        return isinstance(action, dict) and bool(action.get("tool_calls"))
     
     def _execute_tool_call(self, action: ActionType) -> str:
-        """Execute a tool call and return the result."""
-        original_cwd = os.getcwd()
+        """Execute a tool call and return the result.
+        
+        Independent calls in a batch run concurrently; calls whose paths
+        overlap, and every execute_shell call, keep their original order.
+        Results are joined in submission order.
+        """
+        # Parse tool call (assuming OpenAI format)
+        tool_calls = action.get("tool_calls", [])
+        parsed_calls = [
+            (tool_call["function"]["name"], json_loads(tool_call["function"]["arguments"]))
+            for tool_call in tool_calls
+        ]
+        
+        results = []
+        wave = []
+        wave_paths = []
+        for function_name, arguments in parsed_calls:
+            paths = self._get_call_paths(function_name, arguments)
+            if wave and (paths is None or wave_paths[-1] is None or
+                         any(self._paths_conflict(paths, other) for other in wave_paths)):
+                results.extend(self._run_wave(wave))
+                wave, wave_paths = [], []
+            wave.append((function_name, arguments))
+            wave_paths.append(paths)
+        results.extend(self._run_wave(wave))
+        
+        return "\n".join(results)
+    
+    def _run_wave(self, wave: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """Run a group of mutually independent calls, returning results in order."""
+        if len(wave) <= 1 or self.max_tool_workers <= 1:
+            return [f"{self._call_function(name, arguments)}" for name, arguments in wave]
+        
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_tool_workers)
+        futures = [self._pool.submit(self._call_function, name, arguments) for name, arguments in wave]
         try:
-            os.chdir(self.workspace_dir)
-            
-            # Parse tool call (assuming OpenAI format)
-            tool_calls = action.get("tool_calls", [])
-            results = []
-            
-            for tool_call in tool_calls:
-                function_name = tool_call["function"]["name"]
-                arguments = json.loads(tool_call["function"]["arguments"])
-                
-                result = self._call_function(function_name, arguments)
-                results.append(f"{result}")
-            
-            return "\n".join(results)
-            
-        finally:
-            os.chdir(original_cwd)
+            # Collecting in submission order keeps results aligned with the calls
+            return [f"{future.result()}" for future in futures]
+        except BaseException:
+            # Like the sequential path, a failing call stops the batch: drop
+            # queued calls that have not started yet
+            for future in futures:
+                future.cancel()
+            raise
+    
+    def _get_call_paths(self, function_name: str, arguments: Dict[str, Any]):
+        """Return (read paths, written paths) for a call, or None if unknown."""
+        if function_name not in _PATH_ARGUMENTS:
+            return None
+        
+        read_args, write_args = _PATH_ARGUMENTS[function_name]
+        default = "." if function_name == "list_directory" else ""
+        reads = {self._resolve_path(arguments.get(arg, default) or "") for arg in read_args}
+        writes = {self._resolve_path(arguments.get(arg) or "") for arg in write_args}
+        return reads, writes
+    
+    @staticmethod
+    def _paths_conflict(paths: Tuple[Set[str], Set[str]], other: Tuple[Set[str], Set[str]]) -> bool:
+        """Check whether two calls touch overlapping paths with at least one write."""
+        def overlap(a: str, b: str) -> bool:
+            return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+        
+        reads, writes = paths
+        other_reads, other_writes = other
+        return (any(overlap(w, p) for w in writes for p in other_reads | other_writes) or
+                any(overlap(w, p) for w in other_writes for p in reads))
+    
+    def _resolve_path(self, path: str) -> str:
+        """Resolve a tool path against the workspace without changing the process cwd."""
+        return os.path.normpath(os.path.join(self.workspace_dir, path))
+    
+    def _error_text(self, error: Exception) -> str:
+        """Error message with workspace paths shown relative, as the agent wrote them.
+        
+        Tool paths are resolved to absolute paths, so OSError messages would
+        otherwise carry the random workspace directory into the observation.
+        """
+        return str(error).replace(self.workspace_dir + os.sep, "").replace(self.workspace_dir, ".")
     
     def _evaluate_final_answer(self, action: ActionType) -> str:
         """Evaluate agent's final answer."""
@@ -129,12 +504,16 @@ class CommandLineEnvironment(StaticEnvironment):
             return False
         
         try:
-            original_cwd = os.getcwd()
-            os.chdir(self.workspace_dir)
-            
-            # Execute verification script
+            code = _compile_script(self.current_task["verify"], "<verify>")
             local_vars = {"os": os, "__workspace__": self.workspace_dir}
-            exec(self.current_task["verify"], local_vars)
+            with _CWD_LOCK:
+                original_cwd = os.getcwd()
+                try:
+                    os.chdir(self.workspace_dir)
+                    # Execute verification script
+                    exec(code, local_vars)
+                finally:
+                    os.chdir(original_cwd)
             
             # Verification script should set 'success' variable
             return local_vars.get("success", False)
@@ -142,37 +521,41 @@ class CommandLineEnvironment(StaticEnvironment):
         except Exception as e:
             print(f"Verification error: {e}")
             return False
-        finally:
-            os.chdir(original_cwd)
     
     def _call_function(self, function_name: str, arguments: Dict[str, Any]) -> str:
         """Call a specific function with arguments."""
-        if function_name == "read_file":
-            return self._read_file(arguments["file_path"])
-        elif function_name == "write_file":
-            return self._write_file(arguments["file_path"], arguments["content"])
-        elif function_name == "list_directory":
-            return self._list_directory(arguments.get("dir_path", "."))
-        elif function_name == "execute_shell":
-            return self._execute_shell(arguments["command"])
-        elif function_name == "create_directory":
-            return self._create_directory(arguments["dir_path"])
-        elif function_name == "delete_file":
-            return self._delete_file(arguments["file_path"])
-        elif function_name == "move_file":
-            return self._move_file(arguments["source_path"], arguments["dest_path"])
-        elif function_name == "copy_file":
-            return self._copy_file(arguments["source_path"], arguments["dest_path"])
-        else:
+        handler = self._dispatch.get(function_name)
+        if handler is None:
             raise EnvironmentError(f"Unknown function: {function_name}")
+        return handler(arguments)
     
     def _read_file(self, file_path: str) -> str:
         """Read file contents."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            fd = os.open(self._resolve_path(file_path), os.O_RDONLY | os.O_CLOEXEC)
+            try:
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                # Read one byte past the cap to detect truncation without a stat
+                data = bytearray()
+                while len(data) <= self.MAX_READ_BYTES:
+                    chunk = os.read(fd, self.MAX_READ_BYTES + 1 - len(data))
+                    if not chunk:
+                        break
+                    data.extend(chunk)
+            finally:
+                os.close(fd)
+            
+            if len(data) > self.MAX_READ_BYTES:
+                content = data[:self.MAX_READ_BYTES].decode('utf-8', errors='replace')
+                suffix = f"\n[truncated: file exceeds {self.MAX_READ_BYTES} bytes]"
+            else:
+                content = data.decode('utf-8')
+                suffix = ""
+            # Match text-mode universal newline handling
+            return content.replace('\r\n', '\n').replace('\r', '\n') + suffix
         except Exception as e:
-            return f"Error reading file: {str(e)}"
+            return f"Error reading file: {self._error_text(e)}"
     
     def _write_file(self, file_path: str, content: str) -> str:
         """Write content to file."""
@@ -182,273 +565,225 @@ class CommandLineEnvironment(StaticEnvironment):
                 return "Error writing file: file path is empty"
             
             # Create directory if it doesn't exist
-            dir_path = os.path.dirname(file_path)
-            if dir_path:
-                os.makedirs(dir_path, exist_ok=True)
+            full_path = self._resolve_path(file_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with open(full_path, 'w', encoding='utf-8') as f:
                 f.write(content)
             return f"File {file_path} written successfully"
         except Exception as e:
-            return f"Error writing file: {str(e)}"
+            return f"Error writing file: {self._error_text(e)}"
     
     def _list_directory(self, dir_path: str) -> str:
         """List directory contents."""
         try:
-            items = os.listdir(dir_path)
+            items = os.listdir(self._resolve_path(dir_path))
             return "\n".join(items) if items else "Directory is empty"
         except Exception as e:
-            return f"Error listing directory: {str(e)}"
+            return f"Error listing directory: {self._error_text(e)}"
     
-    def _execute_shell(self, command: str) -> str:
-        """Execute shell command with built-in timeout."""
-        try:
-            # subprocess has its own timeout mechanism
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=25,  # Slightly less than step timeout to allow cleanup
-                cwd=self.workspace_dir
-            )
-            
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                return output if output else "Command executed successfully"
-            else:
-                return f"Command failed with exit code {result.returncode}: {result.stderr.strip()}"
-                
-        except subprocess.TimeoutExpired:
-            return "Command execution timeout"
-        except Exception as e:
-            return f"Error executing command: {str(e)}"
+    def _execute_shell(self, command: str, timeout: int = 25) -> str:
+        """Execute shell command with built-in timeout.
+        
+        Commands run in a subshell of a persistent /bin/sh, which avoids a
+        fork/exec of a fresh shell per call while still isolating cwd and
+        variable changes between commands.
+        """
+        with self._shell_lock:
+            try:
+                returncode, stdout, stderr = self._run_in_shell(command, timeout)
+            except subprocess.TimeoutExpired:
+                self._close_shell()
+                return "Command execution timeout"
+            except BaseException as e:
+                # Shell state is unknown (e.g. interrupted by the step timeout)
+                self._close_shell()
+                if isinstance(e, TimeoutError) or not isinstance(e, Exception):
+                    raise
+                return f"Error executing command: {str(e)}"
+        
+        if returncode == 0:
+            output = stdout.strip()
+            return output if output else "Command executed successfully"
+        else:
+            return f"Command failed with exit code {returncode}: {stderr.strip()}"
+    
+    def _run_in_shell(self, command: str, timeout: int) -> Tuple[int, str, str]:
+        """Run one command in the shell coprocess and return (returncode, stdout, stderr)."""
+        if self._shell is None or self._shell.poll() is not None:
+            self._start_shell()
+        
+        # Single-quote the command for eval so any syntax error stays inside the
+        # subshell; stdin is detached so commands cannot consume the framing.
+        quoted = "'" + command.replace("'", "'\\''") + "'"
+        sentinel = uuid.uuid4().hex
+        script = (f"( eval {quoted} ) </dev/null 2>'{self._shell_stderr_path}'\n"
+                  f"printf '\\n{sentinel}:%d\\n' $?\n")
+        self._shell.stdin.write(script.encode('utf-8'))
+        self._shell.stdin.flush()
+        
+        marker = f"\n{sentinel}:".encode('ascii')
+        limit = self.MAX_SHELL_OUTPUT
+        # Past the limit only a tail long enough to hold the marker line is kept
+        window = len(marker) + 16
+        fd = self._shell.stdout.fileno()
+        buffer = bytearray()
+        truncated = False
+        scanned = 0
+        deadline = time.monotonic() + timeout
+        # Never read past the enclosing step's deadline
+        step_deadline, step_timeout = self._step_deadline or (None, None)
+        capped = step_deadline is not None and step_deadline < deadline
+        if capped:
+            deadline = step_deadline
+        while True:
+            index = buffer.find(marker, scanned)
+            if index != -1 and buffer.find(b"\n", index + len(marker)) != -1:
+                break
+            if index == -1:
+                scanned = max(0, len(buffer) - len(marker))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if capped:
+                    raise TimeoutError(f"Operation timed out after {step_timeout} seconds")
+                raise subprocess.TimeoutExpired(command, timeout)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if ready:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    raise EnvironmentError("Shell process exited unexpectedly")
+                buffer.extend(chunk)
+                if len(buffer) > limit + window:
+                    del buffer[limit:len(buffer) - window]
+                    truncated = True
+                    scanned = limit
+        
+        end = buffer.find(b"\n", index + len(marker))
+        returncode = int(buffer[index + len(marker):end])
+        stdout = buffer[:min(index, limit)].decode('utf-8', errors='replace')
+        if truncated or index > limit:
+            stdout += f"\n[truncated: output exceeds {limit} bytes]"
+        with open(self._shell_stderr_path, 'rb') as f:
+            data = f.read(limit + 1)
+        stderr = data[:limit].decode('utf-8', errors='replace')
+        if len(data) > limit:
+            stderr += f"\n[truncated: output exceeds {limit} bytes]"
+        return returncode, stdout, stderr
+    
+    def _start_shell(self):
+        """Start the /bin/sh coprocess in the workspace directory."""
+        self._close_shell()
+        fd, self._shell_stderr_path = tempfile.mkstemp(prefix="agent_gym_stderr_")
+        os.close(fd)
+        self._shell = subprocess.Popen(
+            ["/bin/sh"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.workspace_dir,
+            start_new_session=True  # Own process group so timeouts kill children too
+        )
+    
+    def _close_shell(self):
+        """Terminate the shell coprocess and any commands it is still running."""
+        if self._shell is not None:
+            try:
+                os.killpg(self._shell.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            self._shell.wait()
+            self._shell.stdin.close()
+            self._shell.stdout.close()
+            self._shell = None
+        
+        if self._shell_stderr_path:
+            try:
+                os.remove(self._shell_stderr_path)
+            except OSError:
+                pass
+            self._shell_stderr_path = None
     
     def _create_directory(self, dir_path: str) -> str:
         """Create directory."""
         try:
-            os.makedirs(dir_path, exist_ok=True)
+            os.makedirs(self._resolve_path(dir_path), exist_ok=True)
             return f"Directory {dir_path} created successfully"
         except Exception as e:
-            return f"Error creating directory: {str(e)}"
+            return f"Error creating directory: {self._error_text(e)}"
     
     def _delete_file(self, file_path: str) -> str:
         """Delete file."""
         try:
-            os.remove(file_path)
+            os.remove(self._resolve_path(file_path))
             return f"File {file_path} deleted successfully"
         except Exception as e:
-            return f"Error deleting file: {str(e)}"
+            return f"Error deleting file: {self._error_text(e)}"
     
     def _move_file(self, source_path: str, dest_path: str) -> str:
         """Move file."""
         try:
-            shutil.move(source_path, dest_path)
+            shutil.move(self._resolve_path(source_path), self._resolve_path(dest_path))
             return f"File moved from {source_path} to {dest_path}"
         except Exception as e:
-            return f"Error moving file: {str(e)}"
+            return f"Error moving file: {self._error_text(e)}"
     
     def _copy_file(self, source_path: str, dest_path: str) -> str:
         """Copy file."""
         try:
-            shutil.copy2(source_path, dest_path)
+            _copy2(self._resolve_path(source_path), self._resolve_path(dest_path))
             return f"File copied from {source_path} to {dest_path}"
         except Exception as e:
-            return f"Error copying file: {str(e)}"
+            return f"Error copying file: {self._error_text(e)}"
     
     def _define_tools(self) -> List[Dict[str, Any]]:
         """Define available tools in OpenAI function calling format."""
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_file",
-                    "description": "Read the contents of a file",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Path to the file to read"
-                            }
-                        },
-                        "required": ["file_path"]
-                    }
-                }
-            },
-            {
-                "type": "function", 
-                "function": {
-                    "name": "write_file",
-                    "description": "Write content to a file",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Path to the file to write"
-                            },
-                            "content": {
-                                "type": "string",
-                                "description": "Content to write to the file"
-                            }
-                        },
-                        "required": ["file_path", "content"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_directory",
-                    "description": "List files and directories in a given path",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "dir_path": {
-                                "type": "string",
-                                "description": "Path to the directory to list (default: current directory)",
-                                "default": "."
-                            }
-                        }
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "execute_shell",
-                    "description": "Execute a shell command",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "command": {
-                                "type": "string",
-                                "description": "Shell command to execute"
-                            }
-                        },
-                        "required": ["command"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_directory", 
-                    "description": "Create a new directory",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "dir_path": {
-                                "type": "string",
-                                "description": "Path of the directory to create"
-                            }
-                        },
-                        "required": ["dir_path"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "delete_file",
-                    "description": "Delete a file",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string", 
-                                "description": "Path to the file to delete"
-                            }
-                        },
-                        "required": ["file_path"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "move_file",
-                    "description": "Move or rename a file",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "source_path": {
-                                "type": "string",
-                                "description": "Source file path"
-                            },
-                            "dest_path": {
-                                "type": "string", 
-                                "description": "Destination file path"
-                            }
-                        },
-                        "required": ["source_path", "dest_path"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "copy_file",
-                    "description": "Copy a file to another location",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "source_path": {
-                                "type": "string",
-                                "description": "Source file path"
-                            },
-                            "dest_path": {
-                                "type": "string",
-                                "description": "Destination file path"
-                            }
-                        },
-                        "required": ["source_path", "dest_path"]
-                    }
-                }
-            }
-        ]
+        return _TOOLS
+    
     def _print_workspace_status(self):
-        """Print initial workspace directory status for debugging."""
-        if not self.workspace_dir:
-            print("Workspace directory not initialized")
+        """Log initial workspace directory status; only walks the tree at DEBUG level."""
+        if not logger.isEnabledFor(logging.DEBUG):
             return
+        logger.debug("%s", self._dump_workspace_tree())
+    
+    def _dump_workspace_tree(self) -> str:
+        """Render the workspace directory tree with a file/directory summary."""
+        if not self.workspace_dir:
+            return "Workspace directory not initialized"
         
-        print(f"\n{'='*50}")
-        print(f"Workspace Directory: {self.workspace_dir}")
-        print(f"{'='*50}")
+        # Single scandir pass that renders the tree and counts entries together
+        lines = [f"\n{'='*50}", f"Workspace Directory: {self.workspace_dir}", f"{'='*50}",
+                 "Directory structure:", "./"]
+        counts = {"dirs": 0, "files": 0}
         
-        try:
-            # List all files and directories in workspace
-            items = []
-            for root, dirs, files in os.walk(self.workspace_dir):
-                level = root.replace(self.workspace_dir, '').count(os.sep)
-                indent = ' ' * 2 * level
-                rel_root = os.path.relpath(root, self.workspace_dir) if root != self.workspace_dir else '.'
-                
-                if level == 0:
-                    print(f"Directory structure:")
-                    print(f"{indent}{rel_root}/")
-                else:
-                    print(f"{indent}{os.path.basename(root)}/")
-                
-                # Print files in current directory
-                sub_indent = ' ' * 2 * (level + 1)
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_size = os.path.getsize(file_path)
-                        print(f"{sub_indent}{file} ({file_size} bytes)")
-                    except:
-                        print(f"{sub_indent}{file} (size unknown)")
+        def walk(dir_path: str, level: int):
+            with os.scandir(dir_path) as it:
+                entries = list(it)
             
-            # Count total items
-            total_files = sum([len(files) for r, d, files in os.walk(self.workspace_dir)])
-            total_dirs = sum([len(dirs) for r, dirs, f in os.walk(self.workspace_dir)])
-            
-            print(f"\nSummary: {total_dirs} directories, {total_files} files")
+            sub_dirs = []
+            sub_indent = ' ' * 2 * (level + 1)
+            for entry in entries:
+                if entry.is_dir():
+                    counts["dirs"] += 1
+                    # Like os.walk, do not descend into symlinked directories
+                    if not entry.is_symlink():
+                        sub_dirs.append(entry)
+                    continue
+                
+                counts["files"] += 1
+                try:
+                    lines.append(f"{sub_indent}{entry.name} ({entry.stat().st_size} bytes)")
+                except OSError:
+                    lines.append(f"{sub_indent}{entry.name} (size unknown)")
             
+            for entry in sub_dirs:
+                lines.append(f"{sub_indent}{entry.name}/")
+                walk(entry.path, level + 1)
+        
+        try:
+            walk(self.workspace_dir, 0)
+            lines.append(f"\nSummary: {counts['dirs']} directories, {counts['files']} files")
         except Exception as e:
-            print(f"Error listing workspace: {e}")
+            lines.append(f"Error listing workspace: {e}")
         
-        print(f"{'='*50}\n")
\ No newline at end of file
+        lines.append(f"{'='*50}\n")
+        return "\n".join(lines)
\ No newline at end of file
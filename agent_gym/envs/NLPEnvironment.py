@@ -1,17 +1,42 @@
 """NLP Environment that uses LLM to simulate user and environment interactions."""
 
-import os
 import json
+import re
+import sys
 import requests
+from requests.adapters import HTTPAdapter
 import time
-import threading
 from typing import Dict, List, Any, Tuple, Optional
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 from ..core.base import StaticEnvironment, timeout_context, TimeoutError
 from ..core.types import ObservationType, ActionType, ToolsType, Reward, Done
 from ..core.exceptions import EnvironmentError
+from ..core.json_utils import json_loads, json_dumps
+from ..core.llm_cache import LLMCache
+
+# Env-LLM output: JSON wrapped in <output> tags, or a bare object with a "type" key
+_OUTPUT_RE = re.compile(r'<output>\s*(\{.*?\})\s*</output>', re.DOTALL)
+_JSON_FALLBACK_RE = re.compile(r'\{[^{}]*"type"[^{}]*\}', re.DOTALL)
+# Escape-free string value of a "content" key in a streamed chunk
+_DELTA_CONTENT_RE = re.compile(rb'"content"\s*:\s*"([^"\\]*)"')
+
+
+def _delta_content(data: bytes) -> Optional[str]:
+    """Return the delta content of one SSE chunk, or None if it carries none.
+    
+    Most chunks hold a single plain-text token, which is sliced out of the raw
+    bytes without building the chunk dict; anything with escapes or an
+    unexpected shape goes through the JSON parser. Raises JSONDecodeError for
+    malformed chunks.
+    """
+    match = _DELTA_CONTENT_RE.search(data)
+    if match is not None and data.count(b'"content"') == 1:
+        return match.group(1).decode('utf-8')
+    chunk_data = json_loads(data)
+    if 'choices' in chunk_data and chunk_data['choices']:
+        return chunk_data['choices'][0].get('delta', {}).get('content')
+    return None
 
 
 class NLPEnvironment(StaticEnvironment):
@@ -23,7 +48,10 @@ class NLPEnvironment(StaticEnvironment):
                  model: str = "gemini-2.5-flash-nothinking",
                  max_turns: int = 20,
                  stream: bool = True,
-                 request_timeout: int = 60):
+                 request_timeout: int = 60,
+                 verbose_stream: bool = False,
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[LLMCache] = None):
         """Initialize the NLP environment.
         
         Args:
@@ -34,6 +62,10 @@ class NLPEnvironment(StaticEnvironment):
             max_turns: Maximum number of conversation turns
             stream: Whether to use streaming responses
             request_timeout: Request timeout in seconds
+            verbose_stream: Whether to echo streamed env-llm output to stdout
+            session: HTTP session to share with other clients; the environment
+                creates and owns one when not given
+            cache: Optional LLMCache for env-llm responses
         """
         super().__init__(data_file, task_id)
         self.env_llm_base_url = env_llm_base_url.rstrip('/')
@@ -42,12 +74,29 @@ class NLPEnvironment(StaticEnvironment):
         self.stream = stream
         self.model = model
         self.request_timeout = request_timeout
+        self.verbose_stream = verbose_stream
         self.current_turn = 0
         self.history = []  # Conversation history from env perspective
         self.system_prompt = self._load_system_prompt()
+        self._query_template = None  # (task, XML before history, XML between history and agent input)
+        self._history_cache = None  # (history list, entry count, joined string)
         
-        # Thread pool for async-like behavior without event loop issues
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        # Request parts that are the same for every env-llm call
+        self._headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.env_llm_api_key}"
+        }
+        self._system_message = {"role": "system", "content": self.system_prompt}
+        
+        # Persistent HTTP session so every turn reuses the keep-alive connection
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self._session = session
+        self.cache = cache
         
         if data_file:
             self._load_task_data()
@@ -84,17 +133,7 @@ class NLPEnvironment(StaticEnvironment):
         """Execute an action by sending it to env-llm."""
         try:
             with timeout_context(timeout):
-                self.current_turn += 1
-                
-                # Validate and prepare current agent input
-                current_agent_input = self._format_agent_input(action)
-                extra_info = self._validate_action(action)
-                
-                # Add agent action to history
-                self.history.append(f"Agent: {current_agent_input}")
-                
-                # Build query for env-llm
-                query = self._build_query(current_agent_input, extra_info)
+                query = self._prepare_step(action)
                 
                 # Call env-llm
                 response = self._call_env_llm(query)
@@ -107,24 +146,50 @@ class NLPEnvironment(StaticEnvironment):
         except Exception as e:
             return f"Environment error: {str(e)}", -0.1, False
     
-    def _call_env_llm(self, query: str, max_retries: int = 3) -> Dict[str, Any]:
-        """Call the environment LLM with streaming support and retries."""
+    def _prepare_step(self, action: ActionType) -> str:
+        """Record the agent action in history and build the env-llm query for it."""
+        self.current_turn += 1
+        
+        # Validate and prepare current agent input, decoding arguments once
+        parsed_args = self._parse_tool_arguments(action)
+        current_agent_input = self._format_agent_input(action, parsed_args)
+        extra_info = self._validate_action(action, parsed_args)
+        
+        # Add agent action to history
+        self.history.append(f"Agent: {current_agent_input}")
+        
+        # Build query for env-llm
+        return self._build_query(current_agent_input, extra_info)
+    
+    def _build_request(self, query: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Build the chat completion payload and headers for a query."""
         payload = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": query}
-            ],
+            "messages": [self._system_message, {"role": "user", "content": query}],
             "temperature": 0.7,
             "max_tokens": 2000,
             "stream": self.stream
         }
+        return payload, self._headers
+    
+    def _call_env_llm(self, query: str, max_retries: int = 3) -> Dict[str, Any]:
+        """Call the environment LLM with streaming support and retries."""
+        payload, headers = self._build_request(query)
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.env_llm_api_key}"
-        }
-        
+        if self.cache is not None:
+            cache_key = self.cache.make_key(f"{self.env_llm_base_url}/v1/chat/completions",
+                                            json_dumps(payload).encode('utf-8'))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            result = self._request_env_llm(payload, headers, max_retries)
+            self.cache.set(cache_key, result)
+            return result
+        return self._request_env_llm(payload, headers, max_retries)
+    
+    def _request_env_llm(self, payload: Dict[str, Any], headers: Dict[str, str],
+                         max_retries: int) -> Dict[str, Any]:
+        """Send an env-llm request, retrying with exponential backoff."""
         for attempt in range(max_retries):
             try:
                 if self.stream:
@@ -152,9 +217,9 @@ class NLPEnvironment(StaticEnvironment):
         url = f"{self.env_llm_base_url}/v1/chat/completions"
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 url,
-                json=payload,
+                data=json_dumps(payload).encode('utf-8'),
                 headers=headers,
                 timeout=self.request_timeout,
                 stream=True
@@ -163,32 +228,37 @@ class NLPEnvironment(StaticEnvironment):
             if response.status_code != 200:
                 raise EnvironmentError(f"Env-LLM API error: {response.status_code} - {response.text}")
             
-            content_buffer = ""
+            content_chunks = []
+            echoed = 0  # Chunks already written to stdout
             
-            for line in response.iter_lines(decode_unicode=True):
+            # Lines stay as bytes; json_loads decodes each payload directly
+            for line in response.iter_lines():
                 if not line:
                     continue
                     
                 line = line.strip()
-                if line.startswith('data: '):
-                    data_str = line[6:]  # Remove 'data: ' prefix
+                if line[:6] == b'data: ':
+                    data = line[6:]  # Remove 'data: ' prefix
                     
-                    if data_str == '[DONE]':
+                    if data == b'[DONE]':
                         break
                     
                     try:
-                        chunk_data = json.loads(data_str)
-                        if 'choices' in chunk_data and chunk_data['choices']:
-                            delta = chunk_data['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                content_buffer += delta['content']
-                                # Print streaming content in real-time for debugging
-                                print(delta['content'], end='', flush=True)
-                                
+                        content = _delta_content(data)
                     except json.JSONDecodeError:
                         continue
+                    
+                    if content:
+                        content_chunks.append(content)
+                        # Echo for debugging in batches rather than per token
+                        if self.verbose_stream and len(content_chunks) - echoed >= 64:
+                            sys.stdout.write(''.join(content_chunks[echoed:]))
+                            sys.stdout.flush()
+                            echoed = len(content_chunks)
             
-            print()  # New line after streaming
+            content_buffer = ''.join(content_chunks)
+            if self.verbose_stream:
+                print(''.join(content_chunks[echoed:]))  # Rest of the output and a newline
             return self._parse_env_output(content_buffer)
             
         finally:
@@ -200,9 +270,9 @@ class NLPEnvironment(StaticEnvironment):
         url = f"{self.env_llm_base_url}/v1/chat/completions"
         payload['stream'] = False
         
-        response = requests.post(
+        response = self._session.post(
             url,
-            json=payload,
+            data=json_dumps(payload).encode('utf-8'),
             headers=headers,
             timeout=self.request_timeout
         )
@@ -215,20 +285,46 @@ class NLPEnvironment(StaticEnvironment):
         
         return self._parse_env_output(content)
     
-    def _format_agent_input(self, action: ActionType) -> str:
+    def _parse_tool_arguments(self, action: ActionType) -> List[Any]:
+        """Decode the arguments of each tool call in an action.
+        
+        Each entry is the decoded value, the exception raised while decoding,
+        or None when the call has no arguments to decode.
+        """
+        if not (isinstance(action, dict) and "tool_calls" in action and action["tool_calls"]):
+            return []
+        
+        parsed = []
+        for tool_call in action["tool_calls"]:
+            func = tool_call.get("function") if isinstance(tool_call, dict) else None
+            if not isinstance(func, dict) or "arguments" not in func:
+                parsed.append(None)
+                continue
+            try:
+                parsed.append(json_loads(func["arguments"]))
+            except Exception as e:
+                parsed.append(e)
+        return parsed
+    
+    def _format_agent_input(self, action: ActionType, parsed_args: Optional[List[Any]] = None) -> str:
         """Format agent action into string representation."""
         if isinstance(action, dict):
             if "tool_calls" in action and action["tool_calls"]:
+                if parsed_args is None:
+                    parsed_args = self._parse_tool_arguments(action)
                 # Format tool calls
                 tool_strs = []
-                for tool_call in action["tool_calls"]:
+                for tool_call, func_args in zip(action["tool_calls"], parsed_args):
                     func_name = tool_call["function"]["name"]
-                    try:
-                        func_args = json.loads(tool_call["function"]["arguments"])
-                        args_str = ", ".join(f"{k}={repr(v)}" for k, v in func_args.items())
-                        tool_strs.append(f"{func_name}({args_str})")
-                    except json.JSONDecodeError:
+                    if func_args is None:
+                        func_args = tool_call["function"]["arguments"]  # Raises KeyError as before
+                    if isinstance(func_args, json.JSONDecodeError):
                         tool_strs.append(f"{func_name}(invalid_args)")
+                        continue
+                    if isinstance(func_args, Exception):
+                        raise func_args
+                    args_str = ", ".join(f"{k}={repr(v)}" for k, v in func_args.items())
+                    tool_strs.append(f"{func_name}({args_str})")
                 return f"Tool calls: {'; '.join(tool_strs)}"
             elif "content" in action:
                 return f"Message: {action['content']}"
@@ -237,7 +333,7 @@ class NLPEnvironment(StaticEnvironment):
         else:
             return str(action)
     
-    def _validate_action(self, action: ActionType) -> str:
+    def _validate_action(self, action: ActionType, parsed_args: Optional[List[Any]] = None) -> str:
         """Validate agent action and return extra info."""
         extra_info_parts = []
         
@@ -248,6 +344,8 @@ class NLPEnvironment(StaticEnvironment):
         # Validate action format
         if isinstance(action, dict):
             if "tool_calls" in action and action["tool_calls"]:
+                if parsed_args is None:
+                    parsed_args = self._parse_tool_arguments(action)
                 # Validate tool calls
                 for i, tool_call in enumerate(action["tool_calls"]):
                     try:
@@ -262,11 +360,12 @@ class NLPEnvironment(StaticEnvironment):
                         if "arguments" not in func:
                             extra_info_parts.append(f"Error: Tool call {i} missing arguments")
                         else:
-                            # Try to parse arguments as JSON
-                            try:
-                                json.loads(func["arguments"])
-                            except json.JSONDecodeError as e:
-                                extra_info_parts.append(f"Error: Tool call {i} has invalid JSON arguments: {e}")
+                            # Arguments must have parsed as JSON
+                            error = parsed_args[i]
+                            if isinstance(error, json.JSONDecodeError):
+                                extra_info_parts.append(f"Error: Tool call {i} has invalid JSON arguments: {error}")
+                            elif isinstance(error, Exception):
+                                raise error
                     
                     except Exception as e:
                         extra_info_parts.append(f"Error: Tool call {i} validation failed: {e}")
@@ -275,51 +374,78 @@ class NLPEnvironment(StaticEnvironment):
     
     def _build_query(self, current_agent_input: Optional[str], extra_info: str) -> str:
         """Build XML query for env-llm."""
-        from datetime import datetime
-        
         task = self.current_task
-        current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Build history string
-        history_str = "\n".join(self.history) if self.history else "No previous interactions"
         
-        # Build tools string
-        tools_str = json.dumps(task.get("tools", []), ensure_ascii=False, indent=2)
-        
-        query = f"""<query>
+        # Everything except history, agent input and extra info is fixed per
+        # task, so the surrounding XML is rendered once and reused every step
+        if self._query_template is None or self._query_template[0] is not task:
+            tools_str = json.dumps(task.get("tools", []), ensure_ascii=False, indent=2)
+            stages_str = json.dumps(task.get("story_stages", []), ensure_ascii=False, indent=2)
+            head = f"""<query>
 <environment_description>{task.get('environment_description', '')}</environment_description>
 <environment_type>{task.get('environment_type', '')}</environment_type>
 <tools>{tools_str}</tools>
-<story_stages>{json.dumps(task.get('story_stages', []), ensure_ascii=False, indent=2)}</story_stages>
-<history>{history_str}</history>
+<story_stages>{stages_str}</story_stages>
+<history>"""
+            middle = f"""</history>
 <user_persona>{task.get('user_persona', '')}</user_persona>
-<current_agent_input>{current_agent_input or ''}</current_agent_input>
-<extra_info>{extra_info}</extra_info>
-</query>"""
+<current_agent_input>"""
+            self._query_template = (task, head, middle)
+        _, head, middle = self._query_template
+        
+        # Build history string
+        history_str = self._history_text()
+        
+        return (f"{head}{history_str}{middle}{current_agent_input or ''}</current_agent_input>\n"
+                f"<extra_info>{extra_info}</extra_info>\n</query>")
+    
+    def _history_text(self) -> str:
+        """Join the history for the query, extending the previous join when possible.
+        
+        History is append-only within an episode, so each turn only joins the
+        entries added since the last query instead of the whole conversation.
+        """
+        if not self.history:
+            return "No previous interactions"
+        
+        cache = self._history_cache
+        if cache is not None and cache[0] is self.history and cache[1] <= len(self.history):
+            _, count, text = cache
+            if count < len(self.history):
+                text = "\n".join([text] + self.history[count:])
+        else:
+            text = "\n".join(self.history)
         
-        return query
+        self._history_cache = (self.history, len(self.history), text)
+        return text
     
     def _parse_env_output(self, content: str) -> Dict[str, Any]:
         """Parse environment LLM output."""
-        import re
+        # Extract content between <output> tags. The usual well-formed reply is
+        # sliced out with two finds; the regexes handle everything else.
+        json_str = None
+        start = content.find('<output>')
+        if start != -1:
+            end = content.find('</output>', start)
+            if end != -1:
+                inner = content[start + 8:end].strip()
+                if inner[:1] == '{' and inner[-1:] == '}':
+                    json_str = inner
         
-        # Extract content between <output> tags
-        pattern = r'<output>\s*(\{.*?\})\s*</output>'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if not match:
-            # Fallback: try to find JSON-like content
-            json_pattern = r'\{[^{}]*"type"[^{}]*\}'
-            json_match = re.search(json_pattern, content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
+        if json_str is None:
+            match = _OUTPUT_RE.search(content)
+            if match:
+                json_str = match.group(1)
             else:
-                raise EnvironmentError(f"Invalid env-llm response format: {content}")
-        else:
-            json_str = match.group(1)
+                # Fallback: try to find JSON-like content
+                json_match = _JSON_FALLBACK_RE.search(content)
+                if json_match:
+                    json_str = json_match.group(0)
+                else:
+                    raise EnvironmentError(f"Invalid env-llm response format: {content}")
         
         try:
-            output_json = json.loads(json_str)
+            output_json = json_loads(json_str)
             
             # Validate required fields
             if "type" not in output_json:
@@ -369,8 +495,10 @@ class NLPEnvironment(StaticEnvironment):
     
     def cleanup(self):
         """Clean up resources."""
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=True)
+        if getattr(self, '_session', None) is not None:
+            if self._owns_session:
+                self._session.close()
+            self._session = None
     
     def __del__(self):
         """Cleanup when object is destroyed."""
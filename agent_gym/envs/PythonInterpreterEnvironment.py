@@ -1,15 +1,185 @@
 """Python Interpreter Environment for Agent Gym."""
 
 import json
+import os
+import re
+import socket
+import hashlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from decimal import Decimal
 from typing import Dict, List, Any, Tuple, Optional
-from pathlib import Path
-from math_verify import parse, verify
 from latex2sympy2_extended import NormalizationConfig
 from math_verify import LatexExtractionConfig, parse, verify
-from ..core.base import StaticEnvironment, timeout_context, TimeoutError
+from ..core.base import StaticEnvironment, TimeoutError
 from ..core.types import ObservationType, ActionType, ToolsType, Reward, Done
 from ..core.exceptions import EnvironmentError
+from ..core.json_utils import json_loads, json_dumps
+
+
+# Extraction settings for predicted answers, built once rather than per verification
+_ANSWER_EXTRACTION_CONFIG = [
+    LatexExtractionConfig(
+        normalization_config=NormalizationConfig(
+            nits=True,  # 允许数字
+            malformed_operators=True,  # 允许运算符
+            basic_latex=True,
+            equations=True,
+            boxed=True,
+            units=True,
+        ),
+        boxed_match_priority=0,
+        try_extract_without_anchor=True,  # 允许在没有特定标记的情况下提取
+    )
+]
+
+
+_DECIMAL_RE = re.compile(r"-?(?:\d+\.?\d*|\.\d+)")
+
+
+def _unwrap_answer(answer: str) -> Optional[str]:
+    """Strip ``$...$`` and/or a ``\\boxed{...}`` wrapping the whole answer.
+    
+    Returns None when the answer carries neither wrapper: math_verify extracts
+    nothing from such strings, so they must not be accepted here either.
+    """
+    answer = answer.strip()
+    wrapped = False
+    if len(answer) > 1 and answer[0] == answer[-1] == "$":
+        answer = answer[1:-1].strip()
+        wrapped = True
+    if answer.startswith("\\boxed{") and answer.endswith("}"):
+        answer = answer[7:-1].strip()
+        wrapped = True
+    if not wrapped or not answer or "$" in answer:
+        return None
+    return answer
+
+
+def _answers_match_exactly(answer: str, gold: str) -> bool:
+    """Cheap check for answers that math_verify would accept without parsing.
+    
+    Matches wrapped answers whose contents are identical, or plain decimal
+    literals with equal values. Only a positive result is conclusive; anything
+    else goes to math_verify.
+    """
+    answer, gold = _unwrap_answer(answer), _unwrap_answer(gold)
+    if answer is None or gold is None:
+        return False
+    if answer == gold:
+        return True
+    if _DECIMAL_RE.fullmatch(answer) and _DECIMAL_RE.fullmatch(gold):
+        return Decimal(answer) == Decimal(gold)
+    return False
+
+
+# Bound on grading one answer off the main thread (parse + verify, 5s each on the main thread)
+_GRADING_TIMEOUT = 10
+_grading_pool = None
+_grading_pool_lock = threading.Lock()
+
+
+def _get_grading_pool() -> ThreadPoolExecutor:
+    """Shared pool that grades answers for callers off the main thread."""
+    global _grading_pool
+    with _grading_pool_lock:
+        if _grading_pool is None:
+            _grading_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent_gym_grade")
+        return _grading_pool
+
+
+def _math_verify_timeout(seconds: int) -> Optional[int]:
+    """Timeout to pass to math_verify, or None off the main thread.
+    
+    math_verify enforces its timeouts with signal.alarm, which only works on the
+    main thread; elsewhere parse/verify raise ValueError unless the timeout is disabled.
+    """
+    return seconds if threading.current_thread() is threading.main_thread() else None
+
+
+@lru_cache(maxsize=4096)
+def _parse_gold(answer: str) -> tuple:
+    """Parse a reference answer; the same gold strings recur across attempts and runs."""
+    return tuple(parse(answer, extraction_mode='first_match', extraction_config=[LatexExtractionConfig()],
+                       parsing_timeout=_math_verify_timeout(5)))
+
+
+@lru_cache(maxsize=4096)
+def _parse_answer(answer: str) -> tuple:
+    """Parse a predicted answer with the lenient extraction settings."""
+    return tuple(parse(answer, extraction_config=_ANSWER_EXTRACTION_CONFIG, extraction_mode='first_match',
+                       parsing_timeout=_math_verify_timeout(5)))
+
+
+def _math_verify_answer(extracted_answer: str, correct_answer: str) -> bool:
+    """Grade an answer against the reference with math_verify."""
+    # 处理反斜杠
+    if extracted_answer.count("\\") % 2 == 1:
+        # 如果提取的答案是单反斜杠，转换为双反斜杠
+        extracted_answer = extracted_answer.replace("\\", "\\\\")
+    
+    # 解析标准答案
+    gold_parsed = _parse_gold(correct_answer)
+    if len(gold_parsed) == 0:
+        return False
+    
+    # 解析提取的答案
+    answer_parsed = _parse_answer(extracted_answer)
+    
+    # 验证答案是否正确
+    return bool(verify(list(answer_parsed), list(gold_parsed),
+                       timeout_seconds=_math_verify_timeout(5)))
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    """HTTP connection that talks to a UNIX domain socket instead of TCP."""
+    
+    def __init__(self, *args, socket_path: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+    
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixHTTPConnection
+
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """Send every request through a single keep-alive pool on a UNIX socket."""
+    
+    def __init__(self, socket_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self._uds_pool = _UnixHTTPConnectionPool(
+            "localhost", maxsize=self._pool_maxsize, block=self._pool_block,
+            socket_path=socket_path
+        )
+    
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._uds_pool
+    
+    def get_connection(self, url, proxies=None):
+        return self._uds_pool
+    
+    def close(self):
+        super().close()
+        self._uds_pool.close()
 
 
 class PythonInterpreterEnvironment(StaticEnvironment):
@@ -17,7 +187,12 @@ class PythonInterpreterEnvironment(StaticEnvironment):
     
     def __init__(self, data_file: str = "agent_gym/data/py.json", task_id: int = 0,
                  sandbox_url: str = "http://localhost:8080",
-                 request_timeout: int = 30):
+                 request_timeout: int = 30,
+                 cache_results: bool = False,
+                 cache_size: int = 512,
+                 sandbox_socket: Optional[str] = None,
+                 warm_connections: int = 0,
+                 session: Optional[requests.Session] = None):
         """Initialize the Python interpreter environment.
         
         Args:
@@ -25,15 +200,73 @@ class PythonInterpreterEnvironment(StaticEnvironment):
             task_id: Index of the task to load from data file
             sandbox_url: URL of the sandbox code execution service
             request_timeout: Request timeout in seconds
+            cache_results: Reuse sandbox results for identical code; only
+                safe when the task's code is deterministic
+            cache_size: Maximum number of cached results
+            sandbox_socket: Path of a UNIX socket the sandbox listens on; when
+                set, requests go over it instead of TCP to sandbox_url
+            warm_connections: Number of sandbox connections to open up front
+                so the first tool calls skip the connection handshake
+            session: HTTP session to share with other clients; ignored when
+                sandbox_socket is set, since that mounts its own transport
         """
         super().__init__(data_file, task_id)
         self.sandbox_url = sandbox_url.rstrip('/')
         self.request_timeout = request_timeout
         self.tools = self._define_tools()
         
+        # Persistent HTTP session so sandbox calls reuse keep-alive connections;
+        # only connection failures are retried, since POSTs are not idempotent
+        self.sandbox_socket = sandbox_socket
+        self._headers = {"Content-Type": "application/json"}
+        if sandbox_socket:
+            # Co-located sandbox: skip the loopback TCP stack entirely
+            self._run_code_url = "http://localhost/run_code"
+            session = None
+        else:
+            self._run_code_url = f"{self.sandbox_url}/run_code"
+        self._owns_session = session is None
+        if session is None:
+            retries = Retry(total=2, backoff_factor=0.1)
+            if sandbox_socket:
+                adapter = _UnixSocketAdapter(sandbox_socket, pool_maxsize=64, max_retries=retries)
+            else:
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=retries)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self._session = session
+        self.max_tool_workers = int(os.environ.get("TOOL_CONCURRENCY_LIMIT", 4))
+        self._pool = None  # Created lazily for turns with several code cells
+        self.cache_results = cache_results
+        self.cache_size = cache_size
+        self._exec_cache: "OrderedDict[bytes, str]" = OrderedDict()  # LRU of formatted results
+        self._exec_cache_lock = threading.Lock()
+        
+        if warm_connections > 0:
+            self._warm_up(warm_connections)
+        
         if data_file:
             self._load_task_data()
     
+    def _warm_up(self, count: int):
+        """Open ``count`` keep-alive connections to the sandbox; failures are ignored."""
+        ping_url = self._run_code_url[:-len("run_code")]
+        
+        def ping(_):
+            try:
+                # Any response will do; it leaves an idle connection in the pool
+                self._session.head(ping_url, timeout=2)
+            except requests.exceptions.RequestException:
+                pass
+        
+        if count == 1:
+            ping(0)
+        else:
+            # Concurrent pings, otherwise they would all share one connection
+            with ThreadPoolExecutor(max_workers=count) as pool:
+                list(pool.map(ping, range(count)))
+    
     def reset(self) -> Tuple[ObservationType, ToolsType]:
         """Reset the environment and return initial question."""
         if not self.current_task:
@@ -43,21 +276,24 @@ class PythonInterpreterEnvironment(StaticEnvironment):
         return question, self.tools
     
     def step(self, action: ActionType, timeout: int = 30) -> Tuple[ObservationType, Reward, Done]:
-        """Execute an action with timeout."""
+        """Execute an action with timeout.
+        
+        The sandbox request is the only blocking call, so the timeout is
+        applied to it directly rather than through a timer thread.
+        """
         try:
-            with timeout_context(timeout):
-                if self._is_tool_call(action):
-                    observation = self._execute_tool_call(action)
-                    reward = 0.0
-                    done = False
-                else:
-                    # Agent provided final answer
-                    observation = self._evaluate_final_answer(action)
-                    reward = 1.0 if self._verify_task_completion(action) else 0.0
-                    done = True
-                
-                return observation, reward, done
-                
+            if self._is_tool_call(action):
+                observation = self._execute_tool_call(action, min(timeout, self.request_timeout))
+                reward = 0.0
+                done = False
+            else:
+                # Agent provided final answer
+                observation = self._evaluate_final_answer(action)
+                reward = 1.0 if self._verify_task_completion(action) else 0.0
+                done = True
+            
+            return observation, reward, done
+            
         except TimeoutError as e:
             return f"Timeout error: {str(e)}", -0.5, False
         except Exception as e:
@@ -65,63 +301,100 @@ class PythonInterpreterEnvironment(StaticEnvironment):
     
     def _is_tool_call(self, action: ActionType) -> bool:
         """Check if the action is a tool call."""
-        if isinstance(action, dict):
-            return "tool_calls" in action and action["tool_calls"]
-        return False
+        return isinstance(action, dict) and bool(action.get("tool_calls"))
     
-    def _execute_tool_call(self, action: ActionType) -> str:
-        """Execute a tool call and return the result."""
+    def _execute_tool_call(self, action: ActionType, timeout: float = None) -> str:
+        """Execute a tool call and return the result.
+        
+        Each run_code request is independent on the sandbox side, so several
+        calls in one turn are sent concurrently; results keep the call order.
+        """
         try:
             # Parse tool call (assuming OpenAI format)
             tool_calls = action.get("tool_calls", [])
-            results = []
+            parsed_calls = [
+                (tool_call["function"]["name"], json_loads(tool_call["function"]["arguments"]))
+                for tool_call in tool_calls
+            ]
             
-            for tool_call in tool_calls:
-                function_name = tool_call["function"]["name"]
-                arguments = json.loads(tool_call["function"]["arguments"])
-                
-                if function_name == "run_python_code":
-                    result = self._run_python_code(arguments["code"])
-                    results.append(result)
-                else:
-                    results.append(f"Error: Unknown function '{function_name}'")
+            if len(parsed_calls) <= 1 or self.max_tool_workers <= 1:
+                results = [self._call_function(name, arguments, timeout)
+                           for name, arguments in parsed_calls]
+            else:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_tool_workers)
+                futures = [self._pool.submit(self._call_function, name, arguments, timeout)
+                           for name, arguments in parsed_calls]
+                results = [future.result() for future in futures]
             
             return "\n\n".join(results)
             
+        except TimeoutError:
+            raise
         except Exception as e:
             return f"Tool execution error: {str(e)}"
     
-    def _run_python_code(self, code: str) -> str:
+    def _call_function(self, function_name: str, arguments: Dict[str, Any],
+                       timeout: float = None) -> str:
+        """Call a specific function with arguments."""
+        if function_name == "run_python_code":
+            return self._run_python_code(arguments["code"], timeout)
+        return f"Error: Unknown function '{function_name}'"
+    
+    def _run_python_code(self, code: str, timeout: float = None) -> str:
         """Execute Python code using the sandbox API."""
+        if not self.cache_results:
+            return self._run_in_sandbox(code, timeout)[0]
+        
+        key = hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest()
+        with self._exec_cache_lock:
+            cached = self._exec_cache.get(key)
+            if cached is not None:
+                self._exec_cache.move_to_end(key)
+                return cached
+        
+        output, cacheable = self._run_in_sandbox(code, timeout)
+        if cacheable:
+            with self._exec_cache_lock:
+                self._exec_cache[key] = output
+                if len(self._exec_cache) > self.cache_size:
+                    self._exec_cache.popitem(last=False)
+        return output
+    
+    def _run_in_sandbox(self, code: str, timeout: float = None) -> Tuple[str, bool]:
+        """Send code to the sandbox; return (formatted output, whether the run completed).
+        
+        Raises TimeoutError when the request exceeds ``timeout`` (defaults to
+        ``request_timeout``).
+        """
+        timeout = self.request_timeout if timeout is None else timeout
         try:
             payload = {
                 "code": code,
                 "language": "python"
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(
-                f"{self.sandbox_url}/run_code",
-                json=payload,
-                headers=headers,
-                timeout=self.request_timeout
+            response = self._session.post(
+                self._run_code_url,
+                data=json_dumps(payload).encode('utf-8'),
+                headers=self._headers,
+                timeout=timeout
             )
             
             if response.status_code != 200:
-                return f"Sandbox API error: {response.status_code} - {response.text}"
+                return f"Sandbox API error: {response.status_code} - {response.text}", False
             
-            result = response.json()
-            return self._format_execution_result(result)
+            result = json_loads(response.content)
+            # Only runs that actually executed are worth reusing
+            completed = bool(result.get("run_result")) or result.get("status") == "Success"
+            return self._format_execution_result(result), completed
             
         except requests.exceptions.Timeout:
-            return "Code execution timeout"
+            raise TimeoutError(f"Operation timed out after {timeout} seconds") from None
         except requests.exceptions.RequestException as e:
-            return f"Request error: {str(e)}"
+            return f"Request error: {str(e)}", False
         except Exception as e:
-            return f"Unexpected error: {str(e)}"
+            return f"Unexpected error: {str(e)}", False
     
     def _format_execution_result(self, result: Dict[str, Any]) -> str:
         """Format the execution result for display."""
@@ -203,38 +476,21 @@ class PythonInterpreterEnvironment(StaticEnvironment):
         reward = 0
         if not extracted_answer:
             reward = 0
+        elif _answers_match_exactly(extracted_answer, correct_answer):
+            # 数值相等/完全相同的答案无需解析
+            reward = 1
         else:
-            # 处理反斜杠
-            if extracted_answer.count("\\") % 2 == 1:
-                # 如果提取的答案是单反斜杠，转换为双反斜杠
-                extracted_answer = extracted_answer.replace("\\", "\\\\")
-            
-            # 解析标准答案
-            gold_parsed = parse(correct_answer, extraction_mode='first_match', extraction_config=[LatexExtractionConfig()])
-            
-            if len(gold_parsed) != 0:
-                # 解析提取的答案
-                answer_parsed = parse(
-                    extracted_answer,
-                    extraction_config=[
-                        LatexExtractionConfig(
-                            normalization_config=NormalizationConfig(
-                                nits=True,  # 允许数字
-                                malformed_operators=True,  # 允许运算符
-                                basic_latex=True,
-                                equations=True,
-                                boxed=True,
-                                units=True,
-                            ),
-                            boxed_match_priority=0,
-                            try_extract_without_anchor=True,  # 允许在没有特定标记的情况下提取
-                        )
-                    ],
-                    extraction_mode='first_match',
-                )
-                
-                # 验证答案是否正确
-                reward = float(verify(answer_parsed, gold_parsed))
+            if threading.current_thread() is threading.main_thread():
+                reward = _math_verify_answer(extracted_answer, correct_answer)
+            else:
+                # math_verify cannot time itself out here, so wait on the pool instead;
+                # a timed-out grading keeps running in the background and counts as wrong
+                future = _get_grading_pool().submit(_math_verify_answer, extracted_answer, correct_answer)
+                try:
+                    reward = future.result(timeout=_GRADING_TIMEOUT)
+                except FuturesTimeoutError:
+                    print(f"Answer verification timed out after {_GRADING_TIMEOUT} seconds")
+                    reward = 0
         return bool(reward)
 
     
@@ -262,5 +518,10 @@ class PythonInterpreterEnvironment(StaticEnvironment):
     
     def cleanup(self):
         """Clean up resources."""
-        # No persistent resources to clean up
-        pass
\ No newline at end of file
+        if getattr(self, '_pool', None) is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if getattr(self, '_session', None) is not None:
+            if self._owns_session:
+                self._session.close()
+            self._session = None
\ No newline at end of file
@@ -1,15 +1,24 @@
 """Base Runner for Agent Gym environments."""
 
+import asyncio
 import json
 import time
 import os
+import threading
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Mapping, Optional
 from pathlib import Path
+from types import MappingProxyType
 
-from ..core.base import Environment,Agent
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..core.base import Environment, Agent, load_tasks
 from ..core.exceptions import EnvironmentError
+from ..core.json_utils import json_loads, json_dumps
 
 
 class BaseRunner(ABC):
@@ -26,10 +35,24 @@ class BaseRunner(ABC):
             log_dir: Directory to save logs
             **kwargs: Additional parameters for specific runners
         """
-        self.data_file = data_file
-        self.log_dir = Path(log_dir)
+        # Absolute paths: CommandLineEnvironment chdirs into task workspaces,
+        # which would redirect relative paths used by concurrent tasks
+        self.data_file = os.path.abspath(data_file)
+        self.log_dir = Path(log_dir).absolute()
         self.log_dir.mkdir(exist_ok=True)
         self.kwargs = kwargs
+        self._metadata_extras = None  # Filled on first use, see _cached_metadata_extras
+        self._thread_agents = threading.local()  # One agent per worker thread in concurrent runs
+        self._current_user = self._get_current_user()  # Does not change during a run
+        
+        # One pooled HTTP session for the agents and environments this runner
+        # creates, so keep-alive connections outlive individual tasks. Only
+        # connection failures are retried, since POSTs are not idempotent
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64,
+                              max_retries=Retry(total=2, backoff_factor=0.1))
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
         
         # Initialize agent (delegated to subclass)
         self.agent = self._create_agent()
@@ -37,6 +60,16 @@ class BaseRunner(ABC):
         # Load tasks
         self.tasks = self._load_tasks()
     
+    def close(self):
+        """Close the shared HTTP session."""
+        self._http.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
     @abstractmethod
     def _create_agent(self) -> Agent:
         """Create and return agent instance."""
@@ -55,8 +88,8 @@ class BaseRunner(ABC):
     def _load_tasks(self) -> List[Dict[str, Any]]:
         """Load tasks from data file."""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # Shared with the environments, which load the same file per task
+            return load_tasks(self.data_file)
         except Exception as e:
             raise EnvironmentError(f"Failed to load tasks: {e}")
     
@@ -74,8 +107,17 @@ class BaseRunner(ABC):
         except:
             return "unknown_user"
     
-    def run_single_task(self, task_id: int, verbose: bool = True, max_turns: int = 20) -> Dict[str, Any]:
-        """Run a single task with detailed logging."""
+    def run_single_task(self, task_id: int, verbose: bool = True, max_turns: int = 20,
+                        agent: Optional[Agent] = None) -> Dict[str, Any]:
+        """Run a single task with detailed logging.
+        
+        Args:
+            task_id: Index of the task to run
+            verbose: Whether to print progress
+            max_turns: Maximum number of agent turns
+            agent: Agent to use instead of the runner's shared agent
+        """
+        agent = agent or self.agent
         if task_id >= len(self.tasks):
             raise ValueError(f"Task ID {task_id} not found (available: 0-{len(self.tasks)-1})")
         
@@ -86,45 +128,54 @@ class BaseRunner(ABC):
         turn_count = 0
         total_reward = 0.0
         done = False
-        start_time = time.time()
+        start_time = time.monotonic()
+        
+        # Event timestamps are one wall-clock reading advanced by the monotonic
+        # clock: cheap per event and ordered even if the system clock jumps
+        wall_start = time.time()
+        
+        def event_timestamp() -> str:
+            now = wall_start + (time.monotonic() - start_time)
+            return datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
         
         # Prepare logging
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        timestamp = datetime.fromtimestamp(wall_start, timezone.utc).strftime("%Y%m%d_%H%M%S")
         runner_name = self._get_runner_name().lower().replace(' ', '_')
-        log_file = self.log_dir / f"{runner_name}_task_{task_id}_{timestamp}.json"
+        log_file = self.log_dir / f"{runner_name}_task_{task_id}_{timestamp}.jsonl"
         
         task_info = self.tasks[task_id]
-        current_user = self._get_current_user()
+        current_user = self._current_user
         
-        # Initialize log data
-        log_data = {
+        # Log is append-only JSONL: a header line, one line per trajectory
+        # entry, then a summary line (see load_log for the combined form)
+        log_f = open(log_file, 'ab')
+        self._append_log(log_f, {
             "metadata": {
                 "runner_type": self._get_runner_name(),
                 "task_id": task_id,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "timestamp": event_timestamp(),
                 "user": current_user,
                 "max_turns": max_turns,
-                **self._get_metadata_extras()
+                **self._cached_metadata_extras()
             },
-            "task_config": task_info,
-            "trajectory": [],
-            "summary": {}
-        }
+            "task_config": task_info
+        })
         
         try:
             if verbose:
                 self._print_task_header(task_id, task_info, current_user)
             
-            # Reset environment
+            # Reset environment and the agent's per-task conversation state
             observation, tools = env.reset()
+            agent.reset()
             
             if verbose:
                 self._print_initial_observation(observation)
             
             # Log initial observation
-            log_data["trajectory"].append({
+            self._append_log(log_f, {
                 "turn": 0,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "timestamp": event_timestamp(),
                 "type": "environment_response",
                 "content": observation,
                 "metadata": {
@@ -142,9 +193,9 @@ class BaseRunner(ABC):
                 
                 try:
                     # Agent takes action
-                    action_start_time = time.time()
-                    action = self.agent.act(observation, tools if turn_count == 1 else None)
-                    action_time = time.time() - action_start_time
+                    action_start_time = time.monotonic()
+                    action = agent.act(observation, tools if turn_count == 1 else None)
+                    action_time = time.monotonic() - action_start_time
                     
                     # Format agent action for display
                     action_display = self._format_action_for_display(action)
@@ -153,9 +204,9 @@ class BaseRunner(ABC):
                         print(f"🤖 AGENT: {action_display}")
                     
                     # Log agent action
-                    log_data["trajectory"].append({
+                    self._append_log(log_f, {
                         "turn": turn_count,
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
+                        "timestamp": event_timestamp(),
                         "type": "agent_action",
                         "content": action,
                         "display": action_display,
@@ -166,18 +217,18 @@ class BaseRunner(ABC):
                     })
                     
                     # Environment processes action
-                    env_start_time = time.time()
+                    env_start_time = time.monotonic()
                     next_observation, reward, done = env.step(action)
-                    env_time = time.time() - env_start_time
+                    env_time = time.monotonic() - env_start_time
                     total_reward += reward
                     
                     if verbose:
                         self._print_environment_response(next_observation, reward, done, total_reward)
                     
                     # Log environment response
-                    log_data["trajectory"].append({
+                    self._append_log(log_f, {
                         "turn": turn_count,
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
+                        "timestamp": event_timestamp(),
                         "type": "environment_response",
                         "content": next_observation,
                         "metadata": {
@@ -196,9 +247,9 @@ class BaseRunner(ABC):
                         print(f"❌ {error_msg}")
                     
                     # Log error
-                    log_data["trajectory"].append({
+                    self._append_log(log_f, {
                         "turn": turn_count,
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
+                        "timestamp": event_timestamp(),
                         "type": "error",
                         "content": error_msg,
                         "metadata": {
@@ -208,14 +259,14 @@ class BaseRunner(ABC):
                     break
             
             # Calculate final metrics
-            end_time = time.time()
+            end_time = time.monotonic()
             total_time = end_time - start_time
             
             # Determine success
             success = done and total_reward > 0.5
             
             # Log summary
-            log_data["summary"] = {
+            summary = {
                 "success": success,
                 "total_turns": turn_count,
                 "total_reward": total_reward,
@@ -228,13 +279,12 @@ class BaseRunner(ABC):
                 self._print_task_summary(success, turn_count, total_reward, total_time)
             
             # Save log
-            with open(log_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, ensure_ascii=False, indent=2)
+            self._append_log(log_f, {"summary": summary})
             
             if verbose:
                 print(f"📝 Log saved to: {log_file}")
             
-            return log_data["summary"]
+            return summary
             
         except Exception as main_error:
             error_summary = {
@@ -242,14 +292,11 @@ class BaseRunner(ABC):
                 "error": str(main_error),
                 "total_turns": turn_count,
                 "total_reward": total_reward,
-                "total_time": round(time.time() - start_time, 3)
+                "total_time": round(time.monotonic() - start_time, 3)
             }
             
-            log_data["summary"] = error_summary
-            
             # Save error log
-            with open(log_file, 'w', encoding='utf-8') as f:
-                json.dump(log_data, f, ensure_ascii=False, indent=2)
+            self._append_log(log_f, {"summary": error_summary})
             
             if verbose:
                 print(f"❌ Task failed: {main_error}")
@@ -258,36 +305,95 @@ class BaseRunner(ABC):
             return error_summary
             
         finally:
+            log_f.close()
             env.cleanup()
     
-    def run_all_tasks(self, verbose: bool = True, max_turns: int = 20) -> Dict[str, Any]:
-        """Run all tasks and return aggregated results."""
+    @staticmethod
+    def _append_log(log_f, record: Dict[str, Any]):
+        """Write one record as a JSON line to an open binary log file.
+        
+        Flushed per record so a crash loses at most the line being written.
+        """
+        log_f.write(json_dumps(record).encode('utf-8') + b'\n')
+        log_f.flush()
+    
+    @staticmethod
+    def load_log(log_file: str) -> Dict[str, Any]:
+        """Load a JSONL task log into the combined metadata/trajectory/summary form."""
+        log_data = {"metadata": {}, "task_config": {}, "trajectory": [], "summary": {}}
+        with open(log_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json_loads(line)
+                # Trajectory entries carry a "type"; header and summary lines do not
+                if "type" in record:
+                    log_data["trajectory"].append(record)
+                elif "summary" in record:
+                    log_data["summary"] = record["summary"]
+                else:
+                    log_data["metadata"] = record.get("metadata", {})
+                    log_data["task_config"] = record.get("task_config", {})
+        return log_data
+    
+    def run_all_tasks(self, verbose: bool = True, max_turns: int = 20,
+                      concurrency: int = 1) -> Dict[str, Any]:
+        """Run all tasks and return aggregated results.
+        
+        With ``concurrency`` > 1, tasks run on a thread pool, each worker thread
+        with its own agent since agents keep per-conversation state. Per-turn
+        output is suppressed in that mode; results keep task order.
+        """
         results = []
-        overall_start_time = time.time()
-        current_user = self._get_current_user()
+        overall_start_time = time.monotonic()
+        current_user = self._current_user
         
         if verbose:
-            print(f"\n🚀 Starting {self._get_runner_name()} Test Suite")
-            print(f"Total Tasks: {len(self.tasks)}")
-            print(f"Current Date and Time (UTC): {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"Current User: {current_user}")
+            print(f"\n🚀 Starting {self._get_runner_name()} Test Suite\n"
+                  f"Total Tasks: {len(self.tasks)}\n"
+                  f"Current Date and Time (UTC): {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}\n"
+                  f"Current User: {current_user}")
         
-        for task_id in range(len(self.tasks)):
-            if verbose:
-                print(f"\n📋 Running Task {task_id + 1}/{len(self.tasks)}")
-            
-            try:
-                result = self.run_single_task(task_id, verbose=verbose, max_turns=max_turns)
-                results.append(result)
-            except Exception as e:
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [pool.submit(self._run_task_with_own_agent, task_id, max_turns)
+                           for task_id in range(len(self.tasks))]
+                for task_id, future in enumerate(futures):
+                    try:
+                        result = future.result()
+                        if verbose:
+                            status = "✅" if result.get("success", False) else "❌"
+                            print(f"{status} Task {task_id + 1}/{len(self.tasks)} finished")
+                        results.append(result)
+                    except Exception as e:
+                        if verbose:
+                            print(f"❌ Task {task_id} failed: {e}")
+                        results.append({"success": False, "error": str(e)})
+        else:
+            for task_id in range(len(self.tasks)):
                 if verbose:
-                    print(f"❌ Task {task_id} failed: {e}")
-                results.append({"success": False, "error": str(e)})
+                    print(f"\n📋 Running Task {task_id + 1}/{len(self.tasks)}")
+                
+                try:
+                    result = self.run_single_task(task_id, verbose=verbose, max_turns=max_turns)
+                    results.append(result)
+                except Exception as e:
+                    if verbose:
+                        print(f"❌ Task {task_id} failed: {e}")
+                    results.append({"success": False, "error": str(e)})
         
+        return self.summarize_results(results, time.monotonic() - overall_start_time, verbose)
+    
+    def summarize_results(self, results: List[Dict[str, Any]], overall_time: float,
+                          verbose: bool = True) -> Dict[str, Any]:
+        """Aggregate per-task results (one per task, in order) and save the summary."""
         # Calculate overall statistics
-        overall_time = time.time() - overall_start_time
-        successful_tasks = sum(1 for r in results if r.get("success", False))
-        total_reward = sum(r.get("total_reward", 0) for r in results)
+        successful_tasks = 0
+        total_reward = 0
+        for r in results:
+            if r.get("success", False):
+                successful_tasks += 1
+            total_reward += r.get("total_reward", 0)
         
         summary = {
             "runner_type": self._get_runner_name(),
@@ -304,7 +410,7 @@ class BaseRunner(ABC):
             self._print_final_summary(summary)
         
         # Save overall summary
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
         runner_name = self._get_runner_name().lower().replace(' ', '_')
         summary_file = self.log_dir / f"{runner_name}_summary_{timestamp}.json"
         with open(summary_file, 'w', encoding='utf-8') as f:
@@ -315,23 +421,56 @@ class BaseRunner(ABC):
         
         return summary
     
+    def _thread_agent(self) -> Agent:
+        """Return the calling worker thread's agent, creating it on first use."""
+        agent = getattr(self._thread_agents, "agent", None)
+        if agent is None:
+            agent = self._thread_agents.agent = self._create_agent()
+        return agent
+    
+    def _run_task_with_own_agent(self, task_id: int, max_turns: int) -> Dict[str, Any]:
+        """Run a task quietly with the current thread's agent (used by concurrent runs)."""
+        return self.run_single_task(task_id, verbose=False, max_turns=max_turns,
+                                    agent=self._thread_agent())
+    
+    async def run_batch_async(self, task_ids: List[int], max_turns: int = 20,
+                              max_concurrency: int = 16) -> List[Dict[str, Any]]:
+        """Run the given tasks from an event loop, overlapping their I/O waits.
+        
+        At most ``max_concurrency`` tasks run at once, each on a worker thread
+        using that thread's agent; results keep the order of ``task_ids`` and failed
+        tasks are reported as ``{"success": False, "error": ...}``.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_one(task_id: int) -> Dict[str, Any]:
+            async with semaphore:
+                return await asyncio.to_thread(self._run_task_with_own_agent, task_id, max_turns)
+        
+        outcomes = await asyncio.gather(*(run_one(task_id) for task_id in task_ids),
+                                        return_exceptions=True)
+        return [{"success": False, "error": str(outcome)} if isinstance(outcome, Exception) else outcome
+                for outcome in outcomes]
+    
     # Display methods that can be overridden by subclasses
     def _print_task_header(self, task_id: int, task_info: Dict[str, Any], current_user: str):
         """Print task header information."""
-        print(f"\n{'='*80}")
-        print(f"{self._get_runner_name().upper()} TASK EXECUTION")
-        print(f"Task ID: {task_id}")
-        print(f"Current Date and Time (UTC): {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Current User: {current_user}")
-        print(f"{'='*80}")
+        # One write per block rather than one per line
+        print(f"\n{'='*80}\n"
+              f"{self._get_runner_name().upper()} TASK EXECUTION\n"
+              f"Task ID: {task_id}\n"
+              f"Current Date and Time (UTC): {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}\n"
+              f"Current User: {current_user}\n"
+              f"{'='*80}")
         self._print_task_details(task_info)
         print(f"{'='*80}")
     
     def _print_task_details(self, task_info: Dict[str, Any]):
         """Print task-specific details. Override in subclasses."""
-        for key, value in task_info.items():
-            if isinstance(value, str) and len(value) < 200:
-                print(f"{key.title()}: {value}")
+        lines = [f"{key.title()}: {value}" for key, value in task_info.items()
+                 if isinstance(value, str) and len(value) < 200]
+        if lines:
+            print("\n".join(lines))
     
     def _print_initial_observation(self, observation: str):
         """Print initial observation."""
@@ -339,27 +478,27 @@ class BaseRunner(ABC):
     
     def _print_environment_response(self, observation: str, reward: float, done: bool, total_reward: float):
         """Print environment response."""
-        print(f"🌍 ENV: {observation}")
-        print(f"📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
+        print(f"🌍 ENV: {observation}\n"
+              f"📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
     
     def _print_task_summary(self, success: bool, turn_count: int, total_reward: float, total_time: float):
         """Print task completion summary."""
-        print(f"\n{'='*80}")
-        print(f"TASK COMPLETED")
-        print(f"Success: {'✅' if success else '❌'}")
-        print(f"Total Turns: {turn_count}")
-        print(f"Total Reward: {total_reward}")
-        print(f"Total Time: {total_time:.2f}s")
-        print(f"{'='*80}")
+        print(f"\n{'='*80}\n"
+              f"TASK COMPLETED\n"
+              f"Success: {'✅' if success else '❌'}\n"
+              f"Total Turns: {turn_count}\n"
+              f"Total Reward: {total_reward}\n"
+              f"Total Time: {total_time:.2f}s\n"
+              f"{'='*80}")
     
     def _print_final_summary(self, summary: Dict[str, Any]):
         """Print final summary for all tasks."""
-        print(f"\n{'='*80}")
-        print(f"🏁 ALL TASKS COMPLETED")
-        print(f"Success Rate: {summary['success_rate']:.1%} ({summary['successful_tasks']}/{summary['total_tasks']})")
-        print(f"Average Reward: {summary['average_reward']:.3f}")
-        print(f"Total Time: {summary['total_time']:.2f}s")
-        print(f"{'='*80}")
+        print(f"\n{'='*80}\n"
+              f"🏁 ALL TASKS COMPLETED\n"
+              f"Success Rate: {summary['success_rate']:.1%} ({summary['successful_tasks']}/{summary['total_tasks']})\n"
+              f"Average Reward: {summary['average_reward']:.3f}\n"
+              f"Total Time: {summary['total_time']:.2f}s\n"
+              f"{'='*80}")
     
     # Utility methods that can be overridden
     def _format_action_for_display(self, action: Dict[str, Any]) -> str:
@@ -369,7 +508,7 @@ class BaseRunner(ABC):
             for tool_call in action["tool_calls"]:
                 func_name = tool_call["function"]["name"]
                 try:
-                    func_args = json.loads(tool_call["function"]["arguments"])
+                    func_args = json_loads(tool_call["function"]["arguments"])
                     args_str = ", ".join(f"{k}={repr(v)}" for k, v in func_args.items())
                     tool_strs.append(f"{func_name}({args_str})")
                 except:
@@ -400,4 +539,10 @@ class BaseRunner(ABC):
     
     def _get_metadata_extras(self) -> Dict[str, Any]:
         """Get additional metadata for logging. Override in subclasses."""
-        return {}
\ No newline at end of file
+        return {}
+    
+    def _cached_metadata_extras(self) -> Mapping[str, Any]:
+        """Return _get_metadata_extras(), built once per runner and read-only."""
+        if self._metadata_extras is None:
+            self._metadata_extras = MappingProxyType(self._get_metadata_extras())
+        return self._metadata_extras
\ No newline at end of file
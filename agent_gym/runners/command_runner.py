@@ -19,7 +19,7 @@ class CommandLineRunner(BaseRunner):
         super().__init__(data_file, log_dir)
     
     def _create_agent(self):
-        return MirauAgent(base_url=self.agent_base_url)
+        return MirauAgent(base_url=self.agent_base_url, session=self._http)
     
     def _create_environment(self, task_id: int):
         return CommandLineEnvironment(data_file=self.data_file, task_id=task_id)
@@ -60,5 +60,5 @@ class CommandLineRunner(BaseRunner):
         if len(observation) > 500:
             display_obs = observation[:500] + "\n... (truncated)"
         
-        print(f"💻 RESULT: {display_obs}")
-        print(f"📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
\ No newline at end of file
+        print(f"💻 RESULT: {display_obs}\n"
+              f"📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
\ No newline at end of file
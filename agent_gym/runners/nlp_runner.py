@@ -1,8 +1,9 @@
 """NLP Environment Runner."""
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from ..envs.NLPEnvironment import NLPEnvironment
 from ..agents.miaruAgent import MirauAgent
+from ..core.llm_cache import LLMCache
 from .base_runner import BaseRunner
 
 
@@ -16,7 +17,9 @@ class NLPRunner(BaseRunner):
                  max_turns: int = 20, 
                  stream: bool = True, 
                  request_timeout: int = 60,
-                 log_dir: str = "logs/nlp"):
+                 log_dir: str = "logs/nlp",
+                 cache_backend: Optional[str] = None,
+                 cache_dir: str = ".cache/llm"):
         # Store NLP-specific parameters
         self.agent_base_url = agent_base_url
         self.env_llm_base_url = env_llm_base_url
@@ -24,12 +27,15 @@ class NLPRunner(BaseRunner):
         self.env_max_turns = max_turns
         self.stream = stream
         self.request_timeout = request_timeout
+        # Replays recorded agent/env-llm responses for identical requests
+        self.cache_backend = cache_backend
+        self.llm_cache = LLMCache(cache_backend, cache_dir) if cache_backend else None
         
         # Call parent constructor
         super().__init__(data_file, log_dir)
     
     def _create_agent(self):
-        return MirauAgent(base_url=self.agent_base_url)
+        return MirauAgent(base_url=self.agent_base_url, session=self._http, cache=self.llm_cache)
     
     def _create_environment(self, task_id: int):
         return NLPEnvironment(
@@ -39,7 +45,9 @@ class NLPRunner(BaseRunner):
             env_llm_api_key=self.env_llm_api_key,
             max_turns=self.env_max_turns,
             stream=self.stream,
-            request_timeout=self.request_timeout
+            request_timeout=self.request_timeout,
+            session=self._http,
+            cache=self.llm_cache
         )
     
     def _get_runner_name(self) -> str:
@@ -50,12 +58,14 @@ class NLPRunner(BaseRunner):
             "agent_base_url": self.agent_base_url,
             "env_llm_url": self.env_llm_base_url,
             "stream": self.stream,
-            "request_timeout": self.request_timeout
+            "request_timeout": self.request_timeout,
+            "llm_cache": self.cache_backend
         }
     
     def _print_task_details(self, task_info: Dict[str, Any]):
-        env_desc = task_info.get('environment_description', 'N/A')
-        user_persona = task_info.get('user_persona', 'N/A')
+        # Only called for verbose runs; `or` also covers null fields
+        env_desc = task_info.get('environment_description') or 'N/A'
+        user_persona = task_info.get('user_persona') or 'N/A'
         
         # Truncate long descriptions for display
         if len(env_desc) > 150:
@@ -63,12 +73,12 @@ class NLPRunner(BaseRunner):
         if len(user_persona) > 150:
             user_persona = user_persona[:150] + "..."
             
-        print(f"Environment: {env_desc}")
-        print(f"User Persona: {user_persona}")
+        print(f"Environment: {env_desc}\n"
+              f"User Persona: {user_persona}")
     
     def _print_initial_observation(self, observation: str):
         print(f"\n🎭 USER: {observation}")
     
     def _print_environment_response(self, observation: str, reward: float, done: bool, total_reward: float):
-        print(f"🎭 USER: {observation}")
-        print(f"📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
\ No newline at end of file
+        print(f"🎭 USER: {observation}\n"
+              f"📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
\ No newline at end of file
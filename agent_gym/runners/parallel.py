@@ -0,0 +1,48 @@
+"""Multi-process task execution for Agent Gym runners."""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterable, Type
+
+from ..core.aio import run_async
+from .base_runner import BaseRunner
+
+
+def _run_worker(runner_cls: Type[BaseRunner], runner_kwargs: Dict[str, Any],
+                task_ids: List[int], max_turns: int, concurrency: int) -> List[Dict[str, Any]]:
+    """Build a runner inside the worker process and run its share of the tasks."""
+    with runner_cls(**runner_kwargs) as runner:
+        return run_async(runner.run_batch_async(task_ids, max_turns=max_turns,
+                                                max_concurrency=concurrency))
+
+
+def run_tasks_parallel(runner_cls: Type[BaseRunner], runner_kwargs: Dict[str, Any],
+                       task_ids: Iterable[int], num_workers: int = 2,
+                       per_worker_concurrency: int = 1,
+                       max_turns: int = 20) -> List[Dict[str, Any]]:
+    """Run tasks across worker processes, each overlapping several tasks.
+
+    Every worker reconstructs the runner from ``runner_cls(**runner_kwargs)``,
+    so both must be picklable. Tasks are dealt round-robin to balance long and
+    short tasks. Results keep the order of ``task_ids``; tasks of a worker that
+    dies are reported as failed.
+    """
+    task_ids = list(task_ids)
+    num_workers = max(1, min(num_workers, len(task_ids)))
+    shares = [task_ids[i::num_workers] for i in range(num_workers)]
+
+    results: Dict[int, Dict[str, Any]] = {}
+    # spawn: forking a parent that may hold pool or HTTP threads is unsafe
+    with ProcessPoolExecutor(max_workers=num_workers,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_run_worker, runner_cls, runner_kwargs, share,
+                               max_turns, per_worker_concurrency)
+                   for share in shares]
+        for share, future in zip(shares, futures):
+            try:
+                share_results = future.result()
+            except Exception as e:
+                share_results = [{"success": False, "error": str(e)} for _ in share]
+            results.update(zip(share, share_results))
+
+    return [results[task_id] for task_id in task_ids]
@@ -1,11 +1,27 @@
 """Python Interpreter Environment Runner."""
 
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Optional
 from ..envs.PythonInterpreterEnvironment import PythonInterpreterEnvironment
 from ..agents.miaruAgent import MirauAgent
+from ..core.llm_cache import LLMCache
+from ..core.json_utils import json_loads
 from .base_runner import BaseRunner
 
 
+def _code_from_arguments(arguments: str) -> str:
+    """Return the code block shown for run_python_code arguments."""
+    try:
+        code = json_loads(arguments).get("code", "")
+        return f"```python\n{code}\n```"
+    except Exception:
+        return "```python\n(invalid code)\n```"
+
+
+# Agents often resend the same cell; long cells are rarely repeated verbatim
+_cached_code_from_arguments = lru_cache(maxsize=4096)(_code_from_arguments)
+
+
 class PythonRunner(BaseRunner):
     """Runner for Python Interpreter Environment."""
     
@@ -13,24 +29,33 @@ class PythonRunner(BaseRunner):
                  agent_base_url: str = "http://localhost:7996",
                  sandbox_url: str = "http://localhost:8080", 
                  request_timeout: int = 30,
-                 log_dir: str = "logs/python"):
+                 log_dir: str = "logs/python",
+                 sandbox_socket: Optional[str] = None,
+                 cache_backend: Optional[str] = None,
+                 cache_dir: str = ".cache/llm"):
         # Store agent-specific parameters
         self.agent_base_url = agent_base_url
         self.sandbox_url = sandbox_url
         self.request_timeout = request_timeout
+        self.sandbox_socket = sandbox_socket
+        # Replays recorded agent responses for identical requests
+        self.cache_backend = cache_backend
+        self.llm_cache = LLMCache(cache_backend, cache_dir) if cache_backend else None
         
         # Call parent constructor
         super().__init__(data_file, log_dir)
     
     def _create_agent(self):
-        return MirauAgent(base_url=self.agent_base_url)
+        return MirauAgent(base_url=self.agent_base_url, session=self._http, cache=self.llm_cache)
     
     def _create_environment(self, task_id: int):
         return PythonInterpreterEnvironment(
             data_file=self.data_file,
             task_id=task_id,
             sandbox_url=self.sandbox_url,
-            request_timeout=self.request_timeout
+            request_timeout=self.request_timeout,
+            sandbox_socket=self.sandbox_socket,
+            session=self._http
         )
     
     def _get_runner_name(self) -> str:
@@ -40,31 +65,31 @@ class PythonRunner(BaseRunner):
         return {
             "agent_base_url": self.agent_base_url,
             "sandbox_url": self.sandbox_url,
+            "sandbox_socket": self.sandbox_socket,
+            "llm_cache": self.cache_backend,
             "request_timeout": self.request_timeout
         }
     
     def _print_task_details(self, task_info: Dict[str, Any]):
-        print(f"Question: {task_info.get('question', 'N/A')}")
-        print(f"Expected Answer: {task_info.get('answer', 'N/A')}")
+        print(f"Question: {task_info.get('question', 'N/A')}\n"
+              f"Expected Answer: {task_info.get('answer', 'N/A')}")
     
     def _format_action_for_display(self, action: Dict[str, Any]) -> str:
         if action.get("tool_calls"):
             code_blocks = []
             for tool_call in action["tool_calls"]:
                 if tool_call["function"]["name"] == "run_python_code":
-                    try:
-                        import json
-                        args = json.loads(tool_call["function"]["arguments"])
-                        code = args.get("code", "")
-                        code_blocks.append(f"```python\n{code}\n```")
-                    except:
-                        code_blocks.append("```python\n(invalid code)\n```")
+                    arguments = tool_call["function"]["arguments"]
+                    if isinstance(arguments, str) and len(arguments) < 8192:
+                        code_blocks.append(_cached_code_from_arguments(arguments))
+                    else:
+                        code_blocks.append(_code_from_arguments(arguments))
             return f"🐍 Executing Python code:\n" + "\n\n".join(code_blocks)
         return super()._format_action_for_display(action)
     
     def _print_environment_response(self, observation: str, reward: float, done: bool, total_reward: float):
         if "STDOUT:" in observation or "STDERR:" in observation:
-            print(f"🔧 EXECUTION RESULT:\n{observation}")
+            head = f"🔧 EXECUTION RESULT:\n{observation}"
         else:
-            print(f"📊 FINAL ANSWER: {observation}")
-        print(f"📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
\ No newline at end of file
+            head = f"📊 FINAL ANSWER: {observation}"
+        print(f"{head}\n📊 Reward: {reward}, Done: {done}, Total Reward: {total_reward}")
\ No newline at end of file
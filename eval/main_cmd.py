@@ -1,8 +1,8 @@
 """Main script for running Command Line Environment tasks."""
 
 import argparse
+import time
 from pathlib import Path
-from agent_gym.runners.command_line_runner import CommandLineRunner
 
 
 def main():
@@ -16,6 +16,11 @@ def main():
                        help="Agent API base URL")
     parser.add_argument("--max-turns", type=int, default=10,
                        help="Maximum turns per task")
+    parser.add_argument("--concurrency", type=int, default=1,
+                       help="Number of tasks to run in parallel when running all tasks"
+                            " (per worker process with --workers)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of worker processes when running all tasks")
     parser.add_argument("--log-dir", type=str, default="logs/command_line",
                        help="Directory to save logs")
     parser.add_argument("--quiet", action="store_true",
@@ -28,12 +33,17 @@ def main():
         print(f"❌ Data file not found: {args.data_file}")
         return
     
+    # Imported here so --help and argument errors skip loading the runner stack
+    from agent_gym.runners.command_runner import CommandLineRunner
+    from agent_gym.runners.parallel import run_tasks_parallel
+    
     # Initialize runner
-    runner = CommandLineRunner(
+    runner_kwargs = dict(
         data_file=args.data_file,
         agent_base_url=args.agent_url,
         log_dir=args.log_dir
     )
+    runner = CommandLineRunner(**runner_kwargs)
     
     verbose = not args.quiet
     
@@ -46,13 +56,24 @@ def main():
         else:
             # Run all tasks
             print(f"🚀 Running all tasks from: {args.data_file}")
-            summary = runner.run_all_tasks(verbose=verbose, max_turns=args.max_turns)
+            if args.workers > 1:
+                start_time = time.monotonic()
+                results = run_tasks_parallel(CommandLineRunner, runner_kwargs, range(len(runner.tasks)),
+                                             num_workers=args.workers,
+                                             per_worker_concurrency=args.concurrency,
+                                             max_turns=args.max_turns)
+                summary = runner.summarize_results(results, time.monotonic() - start_time, verbose)
+            else:
+                summary = runner.run_all_tasks(verbose=verbose, max_turns=args.max_turns,
+                                               concurrency=args.concurrency)
             print(f"\n🏁 All tasks completed. Success rate: {summary['success_rate']:.1%}")
             
     except KeyboardInterrupt:
         print(f"\n⏹️  Execution interrupted by user")
     except Exception as e:
         print(f"\n❌ Execution failed: {e}")
+    finally:
+        runner.close()
 
 
 if __name__ == "__main__":
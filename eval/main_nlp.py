@@ -1,8 +1,8 @@
 """Main script for running NLP Environment tasks."""
 
 import argparse
+import time
 from pathlib import Path
-from agent_gym.runners.nlp_runner import NLPRunner
 
 
 def main():
@@ -20,12 +20,21 @@ def main():
                        help="Environment LLM API key")
     parser.add_argument("--max-turns", type=int, default=20,
                        help="Maximum conversation turns")
+    parser.add_argument("--concurrency", type=int, default=1,
+                       help="Number of tasks to run in parallel when running all tasks"
+                            " (per worker process with --workers)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of worker processes when running all tasks")
     parser.add_argument("--timeout", type=int, default=60,
                        help="Request timeout in seconds")
     parser.add_argument("--no-stream", action="store_true",
                        help="Disable streaming responses")
     parser.add_argument("--log-dir", type=str, default="logs/nlp",
                        help="Directory to save logs")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=False,
+                       help="Replay cached LLM responses for identical requests")
+    parser.add_argument("--cache-dir", type=str, default=".cache/llm",
+                       help="Directory for the LLM response cache")
     parser.add_argument("--quiet", action="store_true",
                        help="Run in quiet mode (less verbose output)")
     
@@ -36,8 +45,12 @@ def main():
         print(f"❌ Data file not found: {args.data_file}")
         return
     
+    # Imported here so --help and argument errors skip loading the runner stack
+    from agent_gym.runners.nlp_runner import NLPRunner
+    from agent_gym.runners.parallel import run_tasks_parallel
+    
     # Initialize runner
-    runner = NLPRunner(
+    runner_kwargs = dict(
         data_file=args.data_file,
         agent_base_url=args.agent_url,
         env_llm_base_url=args.env_llm_url,
@@ -45,8 +58,11 @@ def main():
         max_turns=args.max_turns,
         stream=not args.no_stream,
         request_timeout=args.timeout,
-        log_dir=args.log_dir
+        log_dir=args.log_dir,
+        cache_backend="disk" if args.cache else None,
+        cache_dir=args.cache_dir
     )
+    runner = NLPRunner(**runner_kwargs)
     
     verbose = not args.quiet
     
@@ -59,13 +75,24 @@ def main():
         else:
             # Run all tasks
             print(f"🚀 Running all tasks from: {args.data_file}")
-            summary = runner.run_all_tasks(verbose=verbose, max_turns=args.max_turns)
+            if args.workers > 1:
+                start_time = time.monotonic()
+                results = run_tasks_parallel(NLPRunner, runner_kwargs, range(len(runner.tasks)),
+                                             num_workers=args.workers,
+                                             per_worker_concurrency=args.concurrency,
+                                             max_turns=args.max_turns)
+                summary = runner.summarize_results(results, time.monotonic() - start_time, verbose)
+            else:
+                summary = runner.run_all_tasks(verbose=verbose, max_turns=args.max_turns,
+                                               concurrency=args.concurrency)
             print(f"\n🏁 All tasks completed. Success rate: {summary['success_rate']:.1%}")
             
     except KeyboardInterrupt:
         print(f"\n⏹️  Execution interrupted by user")
     except Exception as e:
         print(f"\n❌ Execution failed: {e}")
+    finally:
+        runner.close()
 
 
 if __name__ == "__main__":
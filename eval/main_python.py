@@ -1,8 +1,8 @@
 """Main script for running Python Interpreter tasks."""
 
 import argparse
+import time
 from pathlib import Path
-from agent_gym.runners.python_runner import PythonRunner
 
 
 def main():
@@ -16,12 +16,23 @@ def main():
                        help="Agent API base URL")
     parser.add_argument("--sandbox-url", type=str, default="http://localhost:8080",
                        help="Sandbox API base URL")
+    parser.add_argument("--sandbox-socket", type=str, default=None,
+                       help="UNIX socket of a local sandbox (overrides --sandbox-url)")
     parser.add_argument("--timeout", type=int, default=60,
                        help="Request timeout in seconds")
     parser.add_argument("--max-turns", type=int, default=10,
                        help="Maximum turns per task")
+    parser.add_argument("--concurrency", type=int, default=1,
+                       help="Number of tasks to run in parallel when running all tasks"
+                            " (per worker process with --workers)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of worker processes when running all tasks")
     parser.add_argument("--log-dir", type=str, default="logs/python",
                        help="Directory to save logs")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=False,
+                       help="Replay cached LLM responses for identical requests")
+    parser.add_argument("--cache-dir", type=str, default=".cache/llm",
+                       help="Directory for the LLM response cache")
     parser.add_argument("--quiet", action="store_true",
                        help="Run in quiet mode (less verbose output)")
     
@@ -32,14 +43,22 @@ def main():
         print(f"❌ Data file not found: {args.data_file}")
         return
     
+    # Imported here so --help and argument errors skip loading the runner stack
+    from agent_gym.runners.python_runner import PythonRunner
+    from agent_gym.runners.parallel import run_tasks_parallel
+    
     # Initialize runner
-    runner = PythonRunner(
+    runner_kwargs = dict(
         data_file=args.data_file,
         agent_base_url=args.agent_url,
         sandbox_url=args.sandbox_url,
         request_timeout=args.timeout,
-        log_dir=args.log_dir
+        log_dir=args.log_dir,
+        cache_backend="disk" if args.cache else None,
+        cache_dir=args.cache_dir,
+        sandbox_socket=args.sandbox_socket
     )
+    runner = PythonRunner(**runner_kwargs)
     
     verbose = not args.quiet
     
@@ -52,13 +71,24 @@ def main():
         else:
             # Run all tasks
             print(f"🚀 Running all tasks from: {args.data_file}")
-            summary = runner.run_all_tasks(verbose=verbose, max_turns=args.max_turns)
+            if args.workers > 1:
+                start_time = time.monotonic()
+                results = run_tasks_parallel(PythonRunner, runner_kwargs, range(len(runner.tasks)),
+                                             num_workers=args.workers,
+                                             per_worker_concurrency=args.concurrency,
+                                             max_turns=args.max_turns)
+                summary = runner.summarize_results(results, time.monotonic() - start_time, verbose)
+            else:
+                summary = runner.run_all_tasks(verbose=verbose, max_turns=args.max_turns,
+                                               concurrency=args.concurrency)
             print(f"\n🏁 All tasks completed. Success rate: {summary['success_rate']:.1%}")
             
     except KeyboardInterrupt:
         print(f"\n⏹️  Execution interrupted by user")
     except Exception as e:
         print(f"\n❌ Execution failed: {e}")
+    finally:
+        runner.close()
 
 
 if __name__ == "__main__":
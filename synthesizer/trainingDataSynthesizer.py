@@ -1,20 +1,145 @@
 """Synthesize training data using DeepSeek Agent for Mirau Agent training."""
 
-import json
+import asyncio
+import hashlib
 import time
 import os
+import sqlite3
 import sys
-from datetime import datetime
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from agent_gym.envs.CommandLineEnvironment import CommandLineEnvironment
 from agent_gym.agents.deepseekAgent import DeepSeekAgent
 from agent_gym.runners.base_runner import BaseRunner
+from agent_gym.runners.parallel import run_tasks_parallel
+from agent_gym.core.base import Agent
+from agent_gym.core.aio import run_async
+from agent_gym.core.llm_cache import LLMCache
+from agent_gym.core.json_utils import json_loads, json_dumps, json_dumps_indent
+
+
+# 默认系统提示词 - 重要：要匹配环境的工具名称！
+# 所有任务共用同一个字符串且不含时间戳等可变内容，保证 messages[0] 逐字节一致，
+# 便于命中 DeepSeek 的上下文硬盘缓存（按请求前缀自动生效，无需额外请求头）。
+_DEFAULT_SYSTEM_PROMPT = """You are an intelligent command-line assistant that excels at using Linux commands to complete tasks.
+
+    ## Output Format Requirements
+    You must follow this format:
+    1. First, use <think> tags for analysis
+    2. Then make tool calls or provide final response
+    3. You can call multiple tools at once
+
+    <think type="thinking_type">
+    Your thought process
+    </think>
+
+    Thinking Types:
+    - complex: Deep analysis, 500-2000 tokens, requires thorough thinking and multi-step planning
+    - mid: Medium analysis, 100-500 tokens, needs analysis but relatively simple
+    - quick: Quick judgment, 0-20 tokens, simple and direct operations
+
+    ## Tool Call Format
+    <tool_call>
+    {"name": "tool_name", "arguments": {"parameter": "value"}}
+    </tool_call>
+
+    ## Available Tools
+    You can use the following tools:
+    - execute_shell: Execute shell commands
+    - read_file: Read file contents
+    - write_file: Write content to files
+    - list_directory: List directory contents
+    - create_directory: Create directories
+    - delete_file: Delete files
+    - move_file: Move/rename files
+    - copy_file: Copy files
+
+    ## Examples
+
+    ### Example 1: Complex Task
+    User: Find all Python files in the current directory, count total lines of code (excluding comments and empty lines), and create a summary report
+
+    <think type="complex">
+    This is a complex task that requires multiple steps:
+    1. First, I need to find all Python files in the current directory and subdirectories
+    2. For each Python file, count lines of code excluding comments (lines starting with #) and empty lines
+    3. Sum up all the line counts
+    4. Create a comprehensive summary report with file details
+
+    My approach:
+    - Use find command to locate all .py files
+    - Use grep and wc to count non-comment, non-empty lines
+    - Process each file and collect statistics
+    - Generate a formatted report with totals
+
+    Let me start by finding all Python files and then process them systematically.
+    </think>
+
+    <tool_call>
+    {"name": "execute_shell", "arguments": {"command": "find . -name '*.py' -type f"}}
+    </tool_call>
+
+    <tool_call>
+    {"name": "execute_shell", "arguments": {"command": "find . -name '*.py' -exec wc -l {} +"}}
+    </tool_call>
+
+    ### Example 2: Medium Task
+    User: Check disk usage of the current directory and identify the largest files
+
+    <think type="mid">
+    This task requires checking disk usage and finding large files:
+    1. Get overall disk usage of current directory
+    2. Find the largest files to identify space consumers
+    3. Present the information in a readable format
+
+    I'll use du command for directory usage and find with sort for largest files.
+    </think>
+
+    <tool_call>
+    {"name": "execute_shell", "arguments": {"command": "du -sh ."}}
+    </tool_call>
+
+    <tool_call>
+    {"name": "execute_shell", "arguments": {"command": "find . -type f -exec ls -lh {} + | sort -k5 -hr | head -10"}}
+    </tool_call>
+
+    ### Example 3: Simple Task
+    User: Create a backup directory and copy all .txt files to it
+
+    <think type="quick">
+    Create directory, then copy files
+    </think>
+
+    <tool_call>
+    {"name": "create_directory", "arguments": {"dir_path": "backup"}}
+    </tool_call>
+
+    <tool_call>
+    {"name": "execute_shell", "arguments": {"command": "cp *.txt backup/ 2>/dev/null || echo 'No .txt files found'"}}
+    </tool_call>
 
+    ## Tool Response Format
+    Tool execution results will be returned in this format:
+    <tool_response name="tool_name">tool execution result</tool_response>
+
+    ## Guidelines
+    1. Choose appropriate thinking type based on task complexity
+    2. Make your thinking specific and logical, explaining your analysis and execution plan
+    3. Use multiple related tools efficiently when beneficial
+    4. Ensure command safety with proper error handling (e.g., 2>/dev/null)
+    5. Provide clear summaries and result explanations after completing tasks
+    6. Consider edge cases and provide robust solutions
+    """
 
 class TrainingDataSynthesizer(BaseRunner):
     """Synthesizer for creating Mirau Agent training data using DeepSeek."""
@@ -25,22 +150,46 @@ class TrainingDataSynthesizer(BaseRunner):
                  deepseek_base_url: str = "https://api.deepseek.com",
                  system_prompt: str = "",
                  output_dir: str = "training_data",
-                 log_dir: str = "logs/synthesis"):
+                 log_dir: str = "logs/synthesis",
+                 cache_backend: Optional[str] = None,
+                 cache_dir: str = ".cache/llm",
+                 rpm: float = 30,
+                 resume: bool = False):
         # Store synthesizer specific parameters
         self.deepseek_api_key = deepseek_api_key
         self.deepseek_base_url = deepseek_base_url
         self.system_prompt = system_prompt
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.cache_backend = cache_backend
+        self.llm_cache = LLMCache(cache_backend, cache_dir) if cache_backend else None
+        self.rpm = rpm  # Maximum task starts per minute, 0 for no limit
+        self.resume = resume  # Skip tasks the index records as already synthesized
+        self._index_path = self.output_dir / "synthesis_index.db"
+        with closing(sqlite3.connect(self._index_path)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "task_id INTEGER PRIMARY KEY, task_hash TEXT, path TEXT, success INTEGER, result TEXT)"
+            )
         
         # Call parent constructor
         super().__init__(data_file, log_dir)
+        
+        # DeepSeek 限流 (429) 或服务端错误时按指数退避重试，包括 POST 请求；遵循 Retry-After
+        # 仅重试连接失败和上述状态码；读超时不重试，避免服务端已处理的请求被重复提交
+        self._http.mount(self.deepseek_base_url, HTTPAdapter(
+            pool_connections=16, pool_maxsize=64,
+            max_retries=Retry(total=5, connect=5, read=0, status=5, other=0,
+                              backoff_factor=1, allowed_methods=None,
+                              status_forcelist=(429, 500, 502, 503, 504))))
     
     def _create_agent(self):
         return DeepSeekAgent(
             base_url=self.deepseek_base_url,
             api_key=self.deepseek_api_key,
-            system_prompt=self.system_prompt
+            system_prompt=self.system_prompt,
+            session=self._http,
+            cache=self.llm_cache
         )
     
     def _create_environment(self, task_id: int):
@@ -52,14 +201,47 @@ class TrainingDataSynthesizer(BaseRunner):
     def _get_metadata_extras(self) -> Dict[str, Any]:
         return {
             "deepseek_base_url": self.deepseek_base_url,
-            "output_dir": str(self.output_dir)
+            "output_dir": str(self.output_dir),
+            "llm_cache": self.cache_backend
         }
     
-    def synthesize_single_task(self, task_id: int, verbose: bool = True, max_turns: int = 20) -> Dict[str, Any]:
+    def _task_hash(self, task_id: int) -> str:
+        """Digest of the task definition, so an edited data file is not mistaken for done work."""
+        return hashlib.blake2b(json_dumps(self.tasks[task_id]).encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _load_completed(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Return the recorded result if this exact task was already synthesized successfully."""
+        with closing(sqlite3.connect(self._index_path, timeout=30)) as conn:
+            row = conn.execute(
+                "SELECT task_hash, path, result FROM tasks WHERE task_id = ? AND success = 1", (task_id,)
+            ).fetchone()
+        if row is None or row[0] != self._task_hash(task_id) or not os.path.exists(row[1]):
+            return None
+        return json_loads(row[2])
+    
+    def _record_result(self, task_id: int, result: Dict[str, Any]) -> None:
+        """Record a task's result in the synthesis index."""
+        with closing(sqlite3.connect(self._index_path, timeout=30)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, task_hash, path, success, result) VALUES (?, ?, ?, ?, ?)",
+                (task_id, self._task_hash(task_id), result.get("output_file"),
+                 int(bool(result.get("success") and result.get("output_file"))), json_dumps(result))
+            )
+    
+    def synthesize_single_task(self, task_id: int, verbose: bool = True, max_turns: int = 20,
+                               agent: Optional[Agent] = None) -> Dict[str, Any]:
         """Synthesize training data for a single task."""
+        agent = agent or self.agent
         if task_id >= len(self.tasks):
             raise ValueError(f"Task ID {task_id} not found (available: 0-{len(self.tasks)-1})")
         
+        if self.resume:
+            completed = self._load_completed(task_id)
+            if completed is not None:
+                if verbose:
+                    print(f"⏭️  Task {task_id} already synthesized: {completed.get('output_file')}")
+                return completed
+        
         # Create environment for this task
         env = self._create_environment(task_id)
         
@@ -70,7 +252,7 @@ class TrainingDataSynthesizer(BaseRunner):
         start_time = time.time()
         
         task_info = self.tasks[task_id]
-        current_user = self._get_current_user()
+        current_user = self._current_user
         
         try:
             if verbose:
@@ -78,7 +260,7 @@ class TrainingDataSynthesizer(BaseRunner):
             
             # Reset environment and agent
             observation, tools = env.reset()
-            self.agent.reset()
+            agent.reset()
             
             if verbose:
                 self._print_initial_observation(observation)
@@ -93,17 +275,13 @@ class TrainingDataSynthesizer(BaseRunner):
                 
                 try:
                     # Agent takes action
-                    action_start_time = time.time()
-                    action = self.agent.act(observation, tools if turn_count == 1 else None)
-                    action_time = time.time() - action_start_time
+                    action = agent.act(observation, tools if turn_count == 1 else None)
                     
                     if verbose:
                         print(f"🔧 PARSED ACTION: {self._format_action_for_display(action)}")
                     
                     # Environment processes action
-                    env_start_time = time.time()
                     next_observation, reward, done = env.step(action)
-                    env_time = time.time() - env_start_time
                     total_reward += reward
                     
                     if verbose:
@@ -123,7 +301,7 @@ class TrainingDataSynthesizer(BaseRunner):
             success = done and total_reward > 0.5
             
             # Get conversation history from agent (already in correct format!)
-            messages = self.agent._conversation_history
+            messages = agent._conversation_history
             
             # Save training data
             output_file = None
@@ -132,24 +310,24 @@ class TrainingDataSynthesizer(BaseRunner):
                     "messages": messages
                 }
                 
-                # Generate filename
-                timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-                filename = f"task_{task_id}_{timestamp}.json"
-                output_file = self.output_dir / filename
+                # One file per task: re-running a task replaces its previous sample
+                output_file = self.output_dir / f"task_{task_id}.json"
                 
-                # Save training data file
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(training_data, f, ensure_ascii=False, indent=2)
+                # Save training data file; write then rename so readers never see a partial file
+                tmp_file = output_file.with_suffix('.tmp')
+                tmp_file.write_bytes(json_dumps_indent(training_data))
+                os.replace(tmp_file, output_file)
                 
                 if verbose:
                     print(f"📊 Training data saved to: {output_file}")
                     print(f"📈 Messages count: {len(messages)}")
-                    print(f"📋 Message roles: {[msg['role'] for msg in messages]}")
+                    print(f"📋 Message roles: {', '.join(msg['role'] for msg in messages)}")
                     
                     # 显示最后几条消息的内容摘要
-                    for i, msg in enumerate(messages[-3:]):
-                        content = msg.get('content', '')[:100] + ('...' if len(msg.get('content', '')) > 100 else '')
-                        print(f"   {len(messages)-3+i}: {msg['role']} - {content}")
+                    for i, msg in enumerate(messages[-3:], len(messages) - 3):
+                        content = msg.get('content') or ''
+                        preview = content[:100] + ('...' if len(content) > 100 else '')
+                        print(f"   {i}: {msg['role']} - {preview}")
             else:
                 if verbose:
                     print(f"⚠️  Not enough messages to save training data ({len(messages)} messages)")
@@ -157,7 +335,7 @@ class TrainingDataSynthesizer(BaseRunner):
             if verbose:
                 self._print_task_summary(success, turn_count, total_reward, total_time)
             
-            return {
+            result = {
                 "success": success,
                 "total_turns": turn_count,
                 "total_reward": total_reward,
@@ -165,6 +343,8 @@ class TrainingDataSynthesizer(BaseRunner):
                 "messages_count": len(messages),
                 "output_file": str(output_file) if output_file else None
             }
+            self._record_result(task_id, result)
+            return result
             
         except Exception as main_error:
             if verbose:
@@ -182,79 +362,134 @@ class TrainingDataSynthesizer(BaseRunner):
         finally:
             env.cleanup()
     
-    def synthesize_all_tasks(self, verbose: bool = True, max_turns: int = 20) -> Dict[str, Any]:
-        """Synthesize training data for all tasks."""
+    def synthesize_all_tasks(self, verbose: bool = True, max_turns: int = 20,
+                             max_concurrency: int = 1) -> Dict[str, Any]:
+        """Synthesize training data for all tasks.
+        
+        With ``max_concurrency`` > 1, up to that many tasks run at once, each
+        worker thread with its own agent. Task starts are spaced to stay under
+        ``self.rpm`` tasks per minute. Per-turn output is suppressed in the
+        concurrent mode; results keep task order.
+        """
         results = []
         overall_start_time = time.time()
-        current_user = self._get_current_user()
+        current_user = self._current_user
+        n_tasks = len(self.tasks)
         
         if verbose:
-            print(f"\n🚀 Starting Training Data Synthesis")
-            print(f"Total Tasks: {len(self.tasks)}")
-            print(f"Current Date and Time (UTC): {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"Current User: {current_user}")
-            print(f"Output Directory: {self.output_dir}")
-        
-        successful_files = 0
+            print(f"\n🚀 Starting Training Data Synthesis\n"
+                  f"Total Tasks: {n_tasks}\n"
+                  f"Current Date and Time (UTC): {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}\n"
+                  f"Current User: {current_user}\n"
+                  f"Output Directory: {self.output_dir}")
         
-        for task_id in range(len(self.tasks)):
+        if max_concurrency > 1:
+            results = run_async(self.run_batch_async(range(n_tasks), max_turns, max_concurrency))
             if verbose:
-                print(f"\n📋 Synthesizing Task {task_id + 1}/{len(self.tasks)}")
-            
-            try:
-                result = self.synthesize_single_task(task_id, verbose=verbose, max_turns=max_turns)
-                results.append(result)
-                
-                if result.get("success") and result.get("output_file"):
-                    successful_files += 1
-                    
-                # 任务间短暂休息，避免API限制
-                if task_id < len(self.tasks) - 1:
-                    time.sleep(2)
-                    
-            except Exception as e:
+                for task_id, result in enumerate(results):
+                    status = "✅" if result.get("success") else "❌"
+                    print(f"{status} Task {task_id + 1}/{n_tasks}: {result.get('output_file') or result.get('error', 'no output')}")
+        else:
+            min_interval = 60.0 / self.rpm if self.rpm > 0 else 0.0
+            last_start = None
+            for task_id in range(n_tasks):
                 if verbose:
-                    print(f"❌ Task {task_id} failed: {e}")
-                results.append({"success": False, "error": str(e)})
+                    print(f"\n📋 Synthesizing Task {task_id + 1}/{n_tasks}")
+                
+                # 按 rpm 控制任务启动间隔，避免API限制
+                if last_start is not None:
+                    wait = min_interval - (time.monotonic() - last_start)
+                    if wait > 0:
+                        time.sleep(wait)
+                last_start = time.monotonic()
+                
+                try:
+                    results.append(self.synthesize_single_task(task_id, verbose=verbose, max_turns=max_turns))
+                except Exception as e:
+                    if verbose:
+                        print(f"❌ Task {task_id} failed: {e}")
+                    results.append({"success": False, "error": str(e)})
         
-        # Calculate overall statistics
-        overall_time = time.time() - overall_start_time
-        total_messages = sum(r.get("messages_count", 0) for r in results)
+        return self.summarize_results(results, time.time() - overall_start_time, verbose)
+    
+    def summarize_results(self, results: List[Dict[str, Any]], overall_time: float,
+                          verbose: bool = True) -> Dict[str, Any]:
+        """Aggregate per-task synthesis results (one per task, in order) and save the summary."""
+        n_tasks = len(self.tasks)
+        successful_files = 0
+        total_messages = 0
+        for r in results:
+            if r.get("success") and r.get("output_file"):
+                successful_files += 1
+            total_messages += r.get("messages_count", 0)
         
         summary = {
             "synthesis_type": "DeepSeek -> Mirau Training Data",
-            "total_tasks": len(self.tasks),
+            "total_tasks": n_tasks,
             "successful_files": successful_files,
-            "success_rate": successful_files / len(self.tasks) if self.tasks else 0,
+            "success_rate": successful_files / n_tasks if n_tasks else 0,
             "total_messages": total_messages,
-            "average_messages_per_task": total_messages / len(self.tasks) if self.tasks else 0,
+            "average_messages_per_task": total_messages / n_tasks if n_tasks else 0,
             "total_time": round(overall_time, 3),
             "output_directory": str(self.output_dir),
             "task_results": results
         }
         
         if verbose:
-            print(f"\n{'='*80}")
-            print(f"🏁 SYNTHESIS COMPLETED")
-            print(f"Success Rate: {summary['success_rate']:.1%} ({successful_files}/{len(self.tasks)})")
-            print(f"Total Training Files: {successful_files}")
-            print(f"Total Messages: {total_messages}")
-            print(f"Average Messages per Task: {summary['average_messages_per_task']:.1f}")
-            print(f"Total Time: {overall_time:.2f}s")
-            print(f"Output Directory: {self.output_dir}")
-            print(f"{'='*80}")
+            print(f"\n{'='*80}\n"
+                  f"🏁 SYNTHESIS COMPLETED\n"
+                  f"Success Rate: {summary['success_rate']:.1%} ({successful_files}/{n_tasks})\n"
+                  f"Total Training Files: {successful_files}\n"
+                  f"Total Messages: {total_messages}\n"
+                  f"Average Messages per Task: {summary['average_messages_per_task']:.1f}\n"
+                  f"Total Time: {overall_time:.2f}s\n"
+                  f"Output Directory: {self.output_dir}\n"
+                  f"{'='*80}")
         
         # Save synthesis summary
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
         summary_file = self.output_dir / f"synthesis_summary_{timestamp}.json"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        summary_file.write_bytes(json_dumps_indent(summary))
         
         if verbose:
             print(f"📊 Synthesis summary saved to: {summary_file}")
         
         return summary
-
+    
+    async def run_batch_async(self, task_ids: List[int], max_turns: int = 20,
+                              max_concurrency: int = 16) -> List[Dict[str, Any]]:
+        """Synthesize the given tasks with bounded concurrency and spaced task starts.
+        
+        Overrides the evaluation batch so ``run_tasks_parallel`` workers synthesize
+        training data; results keep the order of ``task_ids``.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        start_lock = asyncio.Lock()
+        min_interval = 60.0 / self.rpm if self.rpm > 0 else 0.0
+        next_start = loop.time()
+        
+        def synthesize_with_own_agent(task_id: int) -> Dict[str, Any]:
+            return self.synthesize_single_task(task_id, verbose=False, max_turns=max_turns,
+                                               agent=self._thread_agent())
+        
+        async def synthesize_one(task_id: int) -> Dict[str, Any]:
+            nonlocal next_start
+            async with semaphore:
+                # 按 rpm 控制任务启动间隔，避免API限制
+                async with start_lock:
+                    delay = next_start - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    next_start = loop.time() + min_interval
+                try:
+                    return await loop.run_in_executor(pool, synthesize_with_own_agent, task_id)
+                except Exception as e:
+                    return {"success": False, "error": str(e)}
+        
+        # Dedicated pool so max_concurrency is not capped by the default executor size
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            return await asyncio.gather(*(synthesize_one(task_id) for task_id in task_ids))
 
 def main():
     """Main function for training data synthesis."""
@@ -277,6 +512,19 @@ def main():
                        help="Directory to save training data files")
     parser.add_argument("--log-dir", type=str, default="logs/synthesis",
                        help="Directory to save logs")
+    parser.add_argument("--max-concurrency", type=int, default=1,
+                       help="Maximum number of tasks synthesized concurrently (default: 1)")
+    parser.add_argument("--rpm", type=float, default=30,
+                       help="Maximum task starts per minute across all workers, 0 for no limit (default: 30)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of worker processes for synthesizing all tasks (default: 1)")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=False,
+                       help="Replay cached DeepSeek responses for identical requests (re-runs only: "
+                            "hits repeat the recorded sample instead of drawing a new one)")
+    parser.add_argument("--cache-dir", type=str, default=".cache/llm",
+                       help="Directory for the LLM response cache")
+    parser.add_argument("--resume", action="store_true",
+                       help="Skip tasks already synthesized successfully into the output directory")
     parser.add_argument("--quiet", action="store_true",
                        help="Run in quiet mode (less verbose output)")
     
@@ -287,127 +535,25 @@ def main():
         print(f"❌ Data file not found: {args.data_file}")
         return
     
-    # Default system prompt if not provided - 重要：要匹配环境的工具名称！
+    # Default system prompt if not provided
     if not args.system_prompt:
-        args.system_prompt = """You are an intelligent command-line assistant that excels at using Linux commands to complete tasks.
-
-    ## Output Format Requirements
-    You must follow this format:
-    1. First, use <think> tags for analysis
-    2. Then make tool calls or provide final response
-    3. You can call multiple tools at once
-
-    <think type="thinking_type">
-    Your thought process
-    </think>
-
-    Thinking Types:
-    - complex: Deep analysis, 500-2000 tokens, requires thorough thinking and multi-step planning
-    - mid: Medium analysis, 100-500 tokens, needs analysis but relatively simple
-    - quick: Quick judgment, 0-20 tokens, simple and direct operations
-
-    ## Tool Call Format
-    <tool_call>
-    {"name": "tool_name", "arguments": {"parameter": "value"}}
-    </tool_call>
-
-    ## Available Tools
-    You can use the following tools:
-    - execute_shell: Execute shell commands
-    - read_file: Read file contents
-    - write_file: Write content to files
-    - list_directory: List directory contents
-    - create_directory: Create directories
-    - delete_file: Delete files
-    - move_file: Move/rename files
-    - copy_file: Copy files
-
-    ## Examples
-
-    ### Example 1: Complex Task
-    User: Find all Python files in the current directory, count total lines of code (excluding comments and empty lines), and create a summary report
-
-    <think type="complex">
-    This is a complex task that requires multiple steps:
-    1. First, I need to find all Python files in the current directory and subdirectories
-    2. For each Python file, count lines of code excluding comments (lines starting with #) and empty lines
-    3. Sum up all the line counts
-    4. Create a comprehensive summary report with file details
-
-    My approach:
-    - Use find command to locate all .py files
-    - Use grep and wc to count non-comment, non-empty lines
-    - Process each file and collect statistics
-    - Generate a formatted report with totals
-
-    Let me start by finding all Python files and then process them systematically.
-    </think>
-
-    <tool_call>
-    {"name": "execute_shell", "arguments": {"command": "find . -name '*.py' -type f"}}
-    </tool_call>
-
-    <tool_call>
-    {"name": "execute_shell", "arguments": {"command": "find . -name '*.py' -exec wc -l {} +"}}
-    </tool_call>
-
-    ### Example 2: Medium Task
-    User: Check disk usage of the current directory and identify the largest files
-
-    <think type="mid">
-    This task requires checking disk usage and finding large files:
-    1. Get overall disk usage of current directory
-    2. Find the largest files to identify space consumers
-    3. Present the information in a readable format
-
-    I'll use du command for directory usage and find with sort for largest files.
-    </think>
-
-    <tool_call>
-    {"name": "execute_shell", "arguments": {"command": "du -sh ."}}
-    </tool_call>
-
-    <tool_call>
-    {"name": "execute_shell", "arguments": {"command": "find . -type f -exec ls -lh {} + | sort -k5 -hr | head -10"}}
-    </tool_call>
-
-    ### Example 3: Simple Task
-    User: Create a backup directory and copy all .txt files to it
-
-    <think type="quick">
-    Create directory, then copy files
-    </think>
-
-    <tool_call>
-    {"name": "create_directory", "arguments": {"dir_path": "backup"}}
-    </tool_call>
-
-    <tool_call>
-    {"name": "execute_shell", "arguments": {"command": "cp *.txt backup/ 2>/dev/null || echo 'No .txt files found'"}}
-    </tool_call>
-
-    ## Tool Response Format
-    Tool execution results will be returned in this format:
-    <tool_response name="tool_name">tool execution result</tool_response>
-
-    ## Guidelines
-    1. Choose appropriate thinking type based on task complexity
-    2. Make your thinking specific and logical, explaining your analysis and execution plan
-    3. Use multiple related tools efficiently when beneficial
-    4. Ensure command safety with proper error handling (e.g., 2>/dev/null)
-    5. Provide clear summaries and result explanations after completing tasks
-    6. Consider edge cases and provide robust solutions
-    """
+        args.system_prompt = _DEFAULT_SYSTEM_PROMPT
     
     # Initialize synthesizer
-    synthesizer = TrainingDataSynthesizer(
+    synthesizer_kwargs = dict(
         data_file=args.data_file,
         deepseek_api_key=args.deepseek_key,
         deepseek_base_url=args.deepseek_url,
         system_prompt=args.system_prompt,
         output_dir=args.output_dir,
-        log_dir=args.log_dir
+        log_dir=args.log_dir,
+        cache_backend="disk" if args.cache else None,
+        cache_dir=args.cache_dir,
+        # 多进程时每个 worker 分摊总的 rpm 配额
+        rpm=args.rpm / max(1, args.workers),
+        resume=args.resume
     )
+    synthesizer = TrainingDataSynthesizer(**synthesizer_kwargs)
     
     verbose = not args.quiet
     
@@ -423,7 +569,17 @@ def main():
         else:
             # Synthesize all tasks
             print(f"🚀 Synthesizing all tasks from: {args.data_file}")
-            summary = synthesizer.synthesize_all_tasks(verbose=verbose, max_turns=args.max_turns)
+            if args.workers > 1:
+                start_time = time.time()
+                results = run_tasks_parallel(TrainingDataSynthesizer, synthesizer_kwargs,
+                                             range(len(synthesizer.tasks)),
+                                             num_workers=args.workers,
+                                             per_worker_concurrency=args.max_concurrency,
+                                             max_turns=args.max_turns)
+                summary = synthesizer.summarize_results(results, time.time() - start_time, verbose)
+            else:
+                summary = synthesizer.synthesize_all_tasks(verbose=verbose, max_turns=args.max_turns,
+                                                           max_concurrency=args.max_concurrency)
             print(f"\n🏁 Synthesis completed. Success rate: {summary['success_rate']:.1%}")
             print(f"📁 Training files created: {summary['successful_files']}")
             
@@ -431,6 +587,8 @@ def main():
         print(f"\n⏹️  Synthesis interrupted by user")
     except Exception as e:
         print(f"\n❌ Synthesis failed: {e}")
+    finally:
+        synthesizer.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""Tests for CommandLineEnvironment shell execution and tool-call scheduling."""
+
+import os
+import time
+
+import pytest
+
+from agent_gym.core.json_utils import json_dumps
+from agent_gym.envs.CommandLineEnvironment import CommandLineEnvironment
+
+
+def _tool_calls(*calls):
+    return {"tool_calls": [
+        {"function": {"name": name, "arguments": json_dumps(arguments)}}
+        for name, arguments in calls
+    ]}
+
+
+@pytest.fixture
+def env():
+    env = CommandLineEnvironment()
+    env.reset()
+    try:
+        yield env
+    finally:
+        env.cleanup()
+
+
+def test_shell_exit_codes(env):
+    assert env._execute_shell("echo hi") == "hi"
+    assert env._execute_shell("true") == "Command executed successfully"
+    assert env._execute_shell("echo oops >&2; exit 3") == "Command failed with exit code 3: oops"
+
+
+def test_shell_commands_do_not_share_cwd_or_variables(env):
+    assert env._execute_shell("mkdir sub && cd sub && export FOO=1") == "Command executed successfully"
+    assert os.path.realpath(env._execute_shell("pwd")) == os.path.realpath(env.workspace_dir)
+    assert env._execute_shell("echo ${FOO:-unset}") == "unset"
+
+
+def test_shell_timeout_keeps_shell_usable(env):
+    assert env._execute_shell("sleep 5", timeout=0.5) == "Command execution timeout"
+    assert env._execute_shell("echo again") == "again"
+
+
+def test_step_timeout_interrupts_shell(env):
+    start = time.monotonic()
+    observation, reward, done = env.step(_tool_calls(("execute_shell", {"command": "sleep 5"})), timeout=1)
+    assert time.monotonic() - start < 2
+    assert observation.startswith("Timeout error")
+    assert (reward, done) == (-0.5, False)
+    assert env._execute_shell("echo again") == "again"
+
+
+def test_paths_conflict():
+    conflict = CommandLineEnvironment._paths_conflict
+    assert not conflict(({"/w/a"}, set()), ({"/w/a"}, set()))
+    assert conflict((set(), {"/w/a"}), ({"/w/a"}, set()))
+    assert conflict(({"/w/a"}, set()), (set(), {"/w/a"}))
+    assert conflict((set(), {"/w/d"}), ({"/w/d/f.txt"}, set()))
+    assert not conflict((set(), {"/w/a"}), ({"/w/ab"}, set()))
+
+
+def test_overlapping_calls_keep_their_order(env):
+    env.max_tool_workers = 4
+    waves = []
+    run_wave = env._run_wave
+
+    def recording_run_wave(wave):
+        waves.append([name for name, _ in wave])
+        return run_wave(wave)
+
+    env._run_wave = recording_run_wave
+    observation = env._execute_tool_call(_tool_calls(
+        ("write_file", {"file_path": "a.txt", "content": "first"}),
+        ("write_file", {"file_path": "b.txt", "content": "other"}),
+        ("read_file", {"file_path": "a.txt"}),
+        ("read_file", {"file_path": "b.txt"}),
+        ("write_file", {"file_path": "a.txt", "content": "second"}),
+        ("read_file", {"file_path": "a.txt"}),
+        ("execute_shell", {"command": "cat a.txt"}),
+    ))
+    assert waves == [
+        ["write_file", "write_file"],
+        ["read_file", "read_file"],
+        ["write_file"],
+        ["read_file"],
+        ["execute_shell"],
+    ]
+    lines = observation.split("\n")
+    assert lines[2:4] == ["first", "other"]
+    assert lines[5:] == ["second", "second"]
@@ -0,0 +1,52 @@
+"""Tests for NLPEnvironment stream parsing."""
+
+import json
+
+import pytest
+
+from agent_gym.core.json_utils import json_loads
+from agent_gym.envs.NLPEnvironment import _delta_content
+
+
+def _parsed_content(data: bytes):
+    chunk_data = json_loads(data)
+    if 'choices' in chunk_data and chunk_data['choices']:
+        return chunk_data['choices'][0].get('delta', {}).get('content')
+    return None
+
+
+def _chunk(content, ensure_ascii=True) -> bytes:
+    chunk = {"id": "1", "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}}]}
+    return json.dumps(chunk, ensure_ascii=ensure_ascii).encode('utf-8')
+
+
+@pytest.mark.parametrize("content", [
+    "plain token",
+    "",
+    None,
+    'quote " inside',
+    "back\\slash",
+    "line\nbreak\ttab",
+    '<output>{"type": "nlp"}</output>',
+    "你好，世界",
+    "emoji 🙂",
+])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_delta_content_matches_json_parse(content, ensure_ascii):
+    data = _chunk(content, ensure_ascii)
+    assert _delta_content(data) == _parsed_content(data) == content
+
+
+def test_delta_content_without_content():
+    for data in (b'{"choices": []}', b'{"choices": [{"delta": {}}]}', b'{"usage": {"total_tokens": 3}}'):
+        assert _delta_content(data) is None
+
+
+def test_delta_content_uses_delta_when_content_repeats():
+    data = b'{"message": {"content": "old"}, "choices": [{"delta": {"content": "new"}}]}'
+    assert _delta_content(data) == _parsed_content(data) == "new"
+
+
+def test_delta_content_rejects_malformed_chunk():
+    with pytest.raises(json.JSONDecodeError):
+        _delta_content(b'{"choices": [')
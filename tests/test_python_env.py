@@ -0,0 +1,73 @@
+"""Tests for PythonInterpreterEnvironment answer grading."""
+
+import threading
+import time
+
+from agent_gym.envs import PythonInterpreterEnvironment as py_env
+from agent_gym.envs.PythonInterpreterEnvironment import PythonInterpreterEnvironment, _answers_match_exactly
+
+
+def _verify_in_thread(env, answer, gold):
+    results = []
+    errors = []
+
+    def target():
+        try:
+            results.append(env.verify_answer(answer, gold))
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    assert not errors, errors
+    return results[0]
+
+
+def test_verify_answer_in_worker_thread():
+    env = PythonInterpreterEnvironment()
+    try:
+        # Not an exact match, so grading goes through math_verify's parse/verify
+        assert env.verify_answer("$\\frac{2}{4}$", "$\\frac{1}{2}$")
+        assert _verify_in_thread(env, "$\\frac{2}{4}$", "$\\frac{1}{2}$")
+        assert not _verify_in_thread(env, "$\\frac{1}{3}$", "$\\frac{1}{2}$")
+    finally:
+        env.cleanup()
+
+
+def test_fast_path_only_accepts_what_math_verify_accepts():
+    assert _answers_match_exactly("$42$", "\\boxed{42}")
+    assert _answers_match_exactly("\\boxed{0.50}", "$.5$")
+    assert _answers_match_exactly("$\\frac{1}{2}$", "$\\frac{1}{2}$")
+    # Unwrapped strings yield nothing in math_verify, so they never match here
+    assert not _answers_match_exactly("Paris", "\\boxed{Paris}")
+    assert not _answers_match_exactly("42", "42")
+    # Decimal() would accept this, math_verify does not
+    assert not _answers_match_exactly("$1e3$", "$1000$")
+
+
+def test_verify_answer_scores_like_math_verify():
+    env = PythonInterpreterEnvironment()
+    try:
+        assert not env.verify_answer("Paris", "\\boxed{Paris}")
+        assert env.verify_answer("$Paris$", "\\boxed{Paris}")
+        assert env.verify_answer("\\boxed{3.0}", "\\boxed{3}")
+        assert not env.verify_answer("$2.00000001$", "\\boxed{2}")
+    finally:
+        env.cleanup()
+
+
+def test_slow_grading_in_worker_thread_is_bounded(monkeypatch):
+    def slow_grading(answer, gold):
+        time.sleep(2)
+        return True
+
+    monkeypatch.setattr(py_env, "_math_verify_answer", slow_grading)
+    monkeypatch.setattr(py_env, "_GRADING_TIMEOUT", 0.5)
+    env = PythonInterpreterEnvironment()
+    try:
+        start = time.monotonic()
+        assert not _verify_in_thread(env, "$\\frac{2}{4}$", "$\\frac{1}{2}$")
+        assert time.monotonic() - start < 1.5
+    finally:
+        env.cleanup()
@@ -0,0 +1,41 @@
+"""Tests for timeout_context."""
+
+import threading
+import time
+
+import pytest
+
+from agent_gym.core.base import timeout_context, TimeoutError
+
+
+def test_blocking_body_times_out_on_main_thread():
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        with timeout_context(1):
+            time.sleep(3)
+    assert time.monotonic() - start < 2
+
+
+def test_fast_body_is_not_interrupted():
+    with timeout_context(1):
+        time.sleep(0.01)
+    time.sleep(1.2)  # A stale timer must not fire after the block
+
+
+def test_busy_body_times_out_off_main_thread():
+    errors = []
+
+    def target():
+        try:
+            with timeout_context(0.2):
+                n = 0
+                while True:
+                    n += 1
+        except TimeoutError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(errors) == 1